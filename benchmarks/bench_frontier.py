@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark the crawl frontier against the original list-based discovery loop.
+Runs entirely in memory on a synthetic link graph, so no network is involved.
+
+Usage: python benchmarks/bench_frontier.py [--pages 20000] [--links 40]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from urllib.parse import urljoin
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scraper.frontier import CrawlFrontier, canonicalize_url, is_binary_url
+
+BASE_URL = 'https://docs.example.com'
+
+
+def build_graph(pages: int, links: int, seed: int = 42) -> dict:
+    """Map every page URL to its outgoing hrefs, including fragment/query variants"""
+    rng = random.Random(seed)
+    urls = [f"{BASE_URL}/docs/section{i % 50}/page{i}" for i in range(pages)]
+    graph = {}
+    for url in urls:
+        hrefs = []
+        for _ in range(links):
+            target = rng.choice(urls)
+            variant = rng.random()
+            if variant < 0.2:
+                target += f"#heading-{rng.randint(1, 5)}"
+            elif variant < 0.3:
+                target += f"?utm_source=nav&utm_medium={rng.randint(1, 3)}"
+            hrefs.append(target)
+        graph[url] = hrefs
+    graph[BASE_URL] = urls[:links]
+    return graph
+
+
+def page_key(url: str) -> str:
+    """Graph key for a crawled URL (variants share the page's links)"""
+    return url.split('#')[0].split('?')[0].rstrip('/')
+
+
+def list_loop(graph: dict, max_pages: int):
+    """The original discover_urls_by_crawling loop, minus the HTTP requests"""
+    to_visit = [BASE_URL]
+    discovered = set()
+    pops = 0
+    peak = 0
+
+    while to_visit and len(discovered) < max_pages:
+        url = to_visit.pop(0)
+        pops += 1
+        if url in discovered:
+            continue
+
+        discovered.add(url)
+        for href in graph.get(page_key(url), []):
+            full_url = urljoin(url, href)
+            if (full_url.startswith(BASE_URL) and
+                    full_url not in discovered and
+                    not any(ext in full_url for ext in ['.pdf', '.zip', '.png', '.jpg', '.gif'])):
+                to_visit.append(full_url)
+        peak = max(peak, len(to_visit))
+
+    return len(discovered), pops, peak
+
+
+def frontier_loop(graph: dict, max_pages: int):
+    """The same crawl driven by CrawlFrontier"""
+    frontier = CrawlFrontier()
+    frontier.add(BASE_URL)
+    discovered = []
+    pops = 0
+    peak = 0
+
+    while len(discovered) < max_pages:
+        item = frontier.pop()
+        if item is None:
+            break
+        url, depth = item
+        pops += 1
+
+        discovered.append(url)
+        for href in graph.get(page_key(url), []):
+            full_url = canonicalize_url(urljoin(url, href))
+            if full_url.startswith(BASE_URL) and not is_binary_url(full_url):
+                frontier.add(full_url, depth + 1)
+        peak = max(peak, len(frontier))
+
+    return len(set(discovered)), pops, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Crawl frontier benchmark')
+    parser.add_argument('--pages', type=int, default=20000, help='Pages in the synthetic site')
+    parser.add_argument('--links', type=int, default=40, help='Links per page')
+    args = parser.parse_args()
+
+    graph = build_graph(args.pages, args.links)
+    # The list loop counts fragment/query variants as pages; give it room to find every real page
+    max_pages = args.pages * 2
+
+    print(f"Synthetic site: {args.pages} pages, {args.links} links per page\n")
+    print(f"{'loop':<10} {'seconds':>9} {'pages':>8} {'dequeues':>10} {'peak queue':>11}")
+    for name, loop in (('list', list_loop), ('frontier', frontier_loop)):
+        start = time.perf_counter()
+        pages, pops, peak = loop(graph, max_pages)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<10} {elapsed:>9.2f} {pages:>8} {pops:>10} {peak:>11}")
+
+
+if __name__ == '__main__':
+    main()
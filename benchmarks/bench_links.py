@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Parity check and per-page latency comparison of link extraction for discovery crawling.
+Extracts the internal links of every page with the streaming extractor and with a
+BeautifulSoup tree (the previous discovery path), fails if any page's links differ,
+then times both per page.
+
+Usage: python benchmarks/bench_links.py [--pages 50] [--repeat 20] [extra .html files or directories ...]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bs4 import BeautifulSoup
+
+from benchmarks.synthetic_site import STYLES, generate_site
+from scraper.converter import extract_links
+from scraper.links import extract_page_links
+
+CORPUS_DIR = Path(__file__).parent / 'parity_corpus'
+BASE_URL = 'https://docs.example.com'
+PAGE_URL = f'{BASE_URL}/docs/guide/page'
+
+# Pages exercising <base>, declared charsets and odd markup: (content type, body)
+EDGE_CASES = {
+    'base-href': ('text/html', b'<html><head><base href="/docs/v2/"></head><body>'
+                               b'<a href="intro">x</a><a href="../api?b=2&amp;a=1">y</a>'
+                               b'<a href="https://docs.example.com/abs">z</a></body></html>'),
+    'late-base': ('text/html', b'<a href="before">x</a><base href="/docs/other/"><base href="/ignored/">'
+                               b'<a href="after">y</a>'),
+    'latin-1': ('text/html; charset=ISO-8859-1',
+                '<meta charset="iso-8859-1"><a href="/docs/caf\xe9">caf\xe9</a><A HREF="/docs/x#top">X</A>'
+                .encode('latin-1')),
+    'bom': ('text/html', '﻿<a href="/docs/über">über</a>'.encode('utf-8')),
+    'markup': ('text/html', b'<!-- <a href="/docs/commented">c</a> --><script>"<a href=/docs/js>"</script>'
+                            b'<a href>empty</a><a name="anchor">n</a><a href="/docs/file.pdf">pdf</a>'
+                            b'<a href="mailto:x@example.com">m</a><a href=/docs/unquoted>u</a>'
+                            b'<a href="http://[bad">bad</a><p><a href="/docs/unclosed">')
+}
+
+
+def load_corpus(pages: int, extra_paths) -> dict:
+    """Map page name to (content type, raw HTML) for the parity corpus, synthetic sites and edge cases"""
+    corpus = {f.name: ('text/html', f.read_bytes()) for f in sorted(CORPUS_DIR.glob('*.html'))}
+    for path in map(Path, extra_paths):
+        for f in (sorted(path.rglob('*.html')) if path.is_dir() else [path]):
+            corpus[str(f)] = ('text/html', f.read_bytes())
+    for style in STYLES:
+        site = generate_site(style, pages)
+        for path, (content_type, body) in site.items():
+            if content_type.startswith('text/html'):
+                corpus[f'{style}{path}'] = (content_type, body)
+    corpus.update(EDGE_CASES)
+    return corpus
+
+
+def soup_links(raw: bytes, content_type: str, parser: str = 'html.parser'):
+    return extract_links(BeautifulSoup(raw, parser), PAGE_URL, BASE_URL)
+
+
+def stream_links(raw: bytes, content_type: str):
+    return extract_page_links(raw, PAGE_URL, BASE_URL, content_type=content_type)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Link extraction parity and latency benchmark')
+    parser.add_argument('paths', nargs='*', help='Extra HTML files or directories to include')
+    parser.add_argument('--pages', type=int, default=50, help='Synthetic pages per site style')
+    parser.add_argument('--repeat', type=int, default=20, help='Timed extractions per page')
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.pages, args.paths)
+
+    mismatches = []
+    links = 0
+    for name, (content_type, raw) in corpus.items():
+        expected = soup_links(raw, content_type)
+        links += len(expected)
+        if stream_links(raw, content_type) != expected:
+            mismatches.append(name)
+
+    print(f"Corpus: {len(corpus)} pages, {links} internal links")
+    for name in mismatches:
+        print(f"  MISMATCH {name}")
+    if not mismatches:
+        print("  streaming extractor finds the same links as BeautifulSoup + html.parser")
+
+    extractors = [
+        ('soup + html.parser', soup_links),
+        ('soup + lxml', lambda raw, content_type: soup_links(raw, content_type, 'lxml')),
+        ('streaming', stream_links)
+    ]
+    print(f"\n{'extractor':<20} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'speedup':>8}")
+    baseline_mean = None
+    for label, extract in extractors:
+        samples = []
+        for content_type, raw in corpus.values():
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                extract(raw, content_type)
+                samples.append((time.perf_counter() - start) * 1000)
+        samples.sort()
+        mean = statistics.fmean(samples)
+        baseline_mean = baseline_mean or mean
+        p50 = samples[len(samples) // 2]
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        print(f"{label:<20} {mean:>9.3f} {p50:>9.3f} {p95:>9.3f} {baseline_mean / mean:>7.2f}x")
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
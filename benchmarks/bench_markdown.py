@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Parity check and per-page latency comparison of the HTML-to-markdown engines.
+Renders every page of the parity corpus with each engine/parser combination,
+fails if any output differs from the original markdownify + html.parser path,
+then times render_page per page.
+
+Usage: python benchmarks/bench_markdown.py [--repeat 20] [extra .html files or directories ...]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scraper.converter import (CONTENT_SELECTORS, HTML_PARSERS, MARKDOWN_ENGINES, REMOVE_SELECTORS,
+                               RenderOptions, render_page)
+
+CORPUS_DIR = Path(__file__).parent / 'parity_corpus'
+BASELINE = ('markdownify', 'html.parser')
+
+
+def load_corpus(extra_paths) -> dict:
+    """Map page name to raw HTML bytes for the bundled corpus plus any extra files"""
+    files = sorted(CORPUS_DIR.glob('*.html'))
+    for path in map(Path, extra_paths):
+        files.extend(sorted(path.rglob('*.html')) if path.is_dir() else [path])
+    return {str(f.relative_to(CORPUS_DIR) if f.is_relative_to(CORPUS_DIR) else f): f.read_bytes()
+            for f in files}
+
+
+def options_for(engine: str, parser: str) -> RenderOptions:
+    return RenderOptions(CONTENT_SELECTORS, REMOVE_SELECTORS, 'https://docs.example.com',
+                         markdown_engine=engine, parser=parser)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Markdown engine parity and latency benchmark')
+    parser.add_argument('paths', nargs='*', help='Extra HTML files or directories to include')
+    parser.add_argument('--repeat', type=int, default=20, help='Timed renders per page')
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.paths)
+    combos = [(engine, html_parser) for engine in MARKDOWN_ENGINES for html_parser in HTML_PARSERS]
+    url = 'https://docs.example.com/docs/page'
+
+    mismatches = []
+    for name, raw in corpus.items():
+        expected = render_page(raw, url, options_for(*BASELINE))['markdown']
+        for combo in combos:
+            if render_page(raw, url, options_for(*combo))['markdown'] != expected:
+                mismatches.append((name, combo))
+
+    print(f"Parity corpus: {len(corpus)} pages, {len(combos)} engine/parser combinations")
+    for name, (engine, html_parser) in mismatches:
+        print(f"  MISMATCH {name}: {engine} + {html_parser}")
+    if not mismatches:
+        print("  all outputs identical to markdownify + html.parser")
+
+    print(f"\n{'engine':<12} {'parser':<12} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'speedup':>8}")
+    baseline_mean = None
+    for combo in [BASELINE] + [c for c in combos if c != BASELINE]:
+        options = options_for(*combo)
+        samples = []
+        for raw in corpus.values():
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                render_page(raw, url, options)
+                samples.append((time.perf_counter() - start) * 1000)
+        samples.sort()
+        mean = statistics.fmean(samples)
+        baseline_mean = baseline_mean or mean
+        p50 = samples[len(samples) // 2]
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        print(f"{combo[0]:<12} {combo[1]:<12} {mean:>9.2f} {p50:>9.2f} {p95:>9.2f} "
+              f"{baseline_mean / mean:>7.2f}x")
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+End-to-end scraper throughput benchmark.
+Serves a synthetic documentation site per style from a local server process,
+runs UniversalDocsScraper against it in a fresh process and reports pages/sec,
+per-page latency, peak RSS and time per pipeline stage.
+
+Usage: python benchmarks/bench_scrape.py [--styles docusaurus mkdocs] [--pages 300] [--latency 0.02]
+                                         [--concurrency 8] [--json results.jsonl]
+
+With --json each run is appended as one JSON line tagged with the current git
+commit, so results can be compared across commits.
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.synthetic_site import STYLES, SiteServer, generate_site
+from scraper.converter import HTML_PARSERS, MARKDOWN_ENGINES
+
+
+def serve(style: str, pages: int, page_kb: float, links: int, latency: float,
+          jitter: float, sitemap: bool, ready):
+    """Server process: generate the site and serve it until terminated"""
+    server = SiteServer(generate_site(style, pages, page_kb, links), latency, jitter, sitemap=sitemap)
+    ready.put(server.url)
+    server.serve_forever()
+
+
+def peak_rss_mb(who: int = resource.RUSAGE_SELF) -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class StageTimer:
+    """Wall time spent in each stage, summed over all pages and threads"""
+
+    def __init__(self):
+        self.totals = defaultdict(float)
+        self.counts = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def wrap(self, stage: str, func):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self.totals[stage] += elapsed
+                    self.counts[stage] += 1
+        return timed
+
+
+def percentile(samples, fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run_scrape(url: str, options: dict) -> dict:
+    """Scrape the site at url in this (fresh) process and measure it"""
+    from scraper import universal_scraper
+    from scraper.universal_scraper import UniversalDocsScraper
+
+    stages = StageTimer()
+    # Conversion on the fetch threads goes through the module's render_page; with
+    # worker processes it has to stay picklable, and only fetch and save are timed here
+    if not options['workers']:
+        universal_scraper.render_page = stages.wrap('convert', universal_scraper.render_page)
+
+    # Log to scraper.log as usual, but keep the console quiet
+    logger = logging.getLogger('bench')
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        scraper = UniversalDocsScraper(
+            base_url=url,
+            output_dir=output_dir,
+            rate_limit=options['rate_limit'],
+            max_pages=options['pages'] + 10,
+            concurrency=options['concurrency'],
+            workers=options['workers'],
+            markdown_engine=options['engine'],
+            html_parser=options['parser'],
+            logger=logger
+        )
+        started = {}
+        fetch_page = scraper._fetch_page
+
+        def timed_fetch(page_url, *args, **kwargs):
+            started[page_url] = time.perf_counter()
+            return fetch_page(page_url, *args, **kwargs)
+
+        scraper._fetch_page = stages.wrap('fetch', timed_fetch)
+        scraper._save_page = stages.wrap('save', scraper._save_page)
+        scraper.create_combined_markdown = stages.wrap('combine', scraper.create_combined_markdown)
+
+        latencies = []
+        first_page = None
+        ok_pages = 0
+        start = time.perf_counter()
+        for page_url, ok in scraper.iter_pages():
+            now = time.perf_counter()
+            first_page = first_page or now - start
+            latencies.append(now - started.pop(page_url, now))
+            ok_pages += ok
+        scrape_time = time.perf_counter() - start
+        scraper.save_summary([], ok_pages)
+        scraper.create_combined_markdown()
+        total_time = time.perf_counter() - start
+        scraper.close()
+
+    return {
+        'pages': ok_pages,
+        'seconds': round(total_time, 3),
+        'pages_per_sec': round(ok_pages / scrape_time, 2) if scrape_time else 0.0,
+        'first_page_ms': round((first_page or 0) * 1000, 1),
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 1),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'workers_peak_rss_mb': round(peak_rss_mb(resource.RUSAGE_CHILDREN), 1) if options['workers'] else None,
+        # Stage times are summed across threads, so with concurrency they can exceed the wall time
+        'stage_seconds': {stage: round(total, 3) for stage, total in sorted(stages.totals.items())}
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end scraper throughput benchmark')
+    parser.add_argument('--styles', nargs='+', choices=STYLES, default=list(STYLES))
+    parser.add_argument('--pages', type=int, default=200, help='Pages per synthetic site')
+    parser.add_argument('--page-kb', type=float, default=20, help='Approximate content size per page')
+    parser.add_argument('--links', type=int, default=20, help='Internal links per page body')
+    parser.add_argument('--latency', type=float, default=0.02, help='Server delay per request in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Random +/- variation of the latency')
+    parser.add_argument('--no-sitemap', action='store_true', help='Crawl the sites instead of reading a sitemap')
+    parser.add_argument('-c', '--concurrency', type=int, default=8)
+    parser.add_argument('-w', '--workers', type=int, default=0)
+    parser.add_argument('-r', '--rate-limit', type=float, default=0.0,
+                        help='Scraper rate limit (default: 0, no ceiling)')
+    parser.add_argument('--engine', choices=MARKDOWN_ENGINES, default='tree')
+    parser.add_argument('--parser', choices=HTML_PARSERS, default='html.parser')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per style')
+    parser.add_argument('--json', metavar='PATH', help='Append results as JSON lines to PATH')
+    args = parser.parse_args()
+
+    options = {'pages': args.pages, 'page_kb': args.page_kb, 'links': args.links,
+               'latency': args.latency, 'jitter': args.jitter, 'sitemap': not args.no_sitemap,
+               'concurrency': args.concurrency, 'workers': args.workers, 'rate_limit': args.rate_limit,
+               'engine': args.engine, 'parser': args.parser}
+    commit = git_commit()
+    context = multiprocessing.get_context('spawn')
+
+    print(f"commit {commit}: {args.pages} pages x {args.page_kb:g} KB, {args.links} links/page, "
+          f"latency {args.latency * 1000:g} ms, concurrency {args.concurrency}, workers {args.workers}, "
+          f"{'crawl' if args.no_sitemap else 'sitemap'}")
+    print(f"\n{'style':<11} {'pages':>5} {'sec':>7} {'pages/s':>8} {'first ms':>9} {'p50 ms':>8} "
+          f"{'p99 ms':>8} {'RSS MB':>7}  stage seconds")
+
+    for style in args.styles:
+        ready = context.Queue()
+        server = context.Process(target=serve, daemon=True, args=(
+            style, args.pages, args.page_kb, args.links, args.latency, args.jitter, not args.no_sitemap, ready))
+        server.start()
+        try:
+            url = ready.get(timeout=120)
+            for _ in range(args.repeat):
+                # A fresh process per run keeps peak RSS and warm caches from leaking between runs
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as runner:
+                    result = runner.submit(run_scrape, url, options).result()
+                stage_text = '  '.join(f"{stage} {seconds:.2f}" for stage, seconds in result['stage_seconds'].items())
+                print(f"{style:<11} {result['pages']:>5} {result['seconds']:>7.2f} {result['pages_per_sec']:>8.1f} "
+                      f"{result['first_page_ms']:>9.1f} {result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f} "
+                      f"{result['peak_rss_mb']:>7.1f}  {stage_text}")
+                if args.json:
+                    with open(args.json, 'a') as f:
+                        f.write(json.dumps({'commit': commit, 'timestamp': datetime.now().isoformat(),
+                                            'style': style, 'options': options, **result}) + '\n')
+        finally:
+            server.terminate()
+            server.join()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Synthetic documentation sites for end-to-end scraper benchmarks.
+Generates Docusaurus, MkDocs, Sphinx and GitBook style pages with a sitemap,
+and serves them from a local HTTP server with controllable latency.
+
+Usage: python benchmarks/synthetic_site.py --style mkdocs --pages 500 --port 8000 --latency 0.05
+"""
+
+import argparse
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+STYLES = ('docusaurus', 'mkdocs', 'sphinx', 'gitbook')
+
+WORDS = """
+api request response client server token session header payload endpoint config option
+value default install setup guide reference module function method class object field
+string number boolean array list map queue cache index record event handler callback
+error retry timeout limit page site document section chapter example usage parameter
+return raise create update delete fetch store load parse render convert export import
+user account project team role access policy permission key secret webhook trigger
+build deploy release version upgrade migrate schema table column query filter sort
+stream batch job task worker process thread pool lock signal state status result
+the a an of to in for with on by from and or but when then if each every only also
+quickly safely always never usually first next last before after during between
+""".split()
+
+SECTIONS = ['getting-started', 'guides', 'api', 'reference', 'tutorials',
+            'concepts', 'deployment', 'integrations', 'troubleshooting', 'faq']
+
+
+def page_paths(style: str, pages: int) -> List[str]:
+    """URL paths of the site's pages; the first one is the home page"""
+    paths = ['/']
+    for i in range(1, pages):
+        section = SECTIONS[i % len(SECTIONS)]
+        if style == 'sphinx':
+            paths.append(f'/{section}/page{i}.html')
+        elif style == 'mkdocs':
+            paths.append(f'/{section}/page-{i}/')
+        else:
+            paths.append(f'/docs/{section}/page-{i}')
+    return paths
+
+
+def _sentence(rng: random.Random, words: int = 12) -> str:
+    text = ' '.join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + '.'
+
+
+def _content(rng: random.Random, title: str, size: int, links: List[str]) -> str:
+    """Body HTML of roughly `size` bytes, with the given links spread through the paragraphs"""
+    parts = [f'<h1>{title}</h1>']
+    links = list(links)
+    length = 0
+    block = 0
+    while length < size:
+        kind = block % 6
+        if kind == 0:
+            html = f'<h2 id="section-{block}">{_sentence(rng, 4)[:-1]}</h2>'
+        elif kind == 3:
+            html = '<pre><code class="language-python">' + '\n'.join(
+                f'{rng.choice(WORDS)}_{j} = client.{rng.choice(WORDS)}("{rng.choice(WORDS)}")'
+                for j in range(rng.randint(3, 8))) + '</code></pre>'
+        elif kind == 4:
+            html = '<ul>' + ''.join(f'<li>{_sentence(rng, 8)}</li>' for _ in range(rng.randint(3, 6))) + '</ul>'
+        elif kind == 5:
+            rows = ''.join(f'<tr><td><code>{rng.choice(WORDS)}</code></td><td>{_sentence(rng, 6)}</td></tr>'
+                           for _ in range(rng.randint(2, 5)))
+            html = f'<table><thead><tr><th>Name</th><th>Description</th></tr></thead><tbody>{rows}</tbody></table>'
+        else:
+            sentences = [_sentence(rng) for _ in range(rng.randint(3, 6))]
+            if links:
+                href = links.pop()
+                sentences.insert(1, f'See <a href="{href}">{rng.choice(WORDS)} {rng.choice(WORDS)}</a>.')
+            html = f'<p>{" ".join(sentences)}</p>'
+        parts.append(html)
+        length += len(html)
+        block += 1
+    # Whatever links did not fit in the paragraphs go into a "see also" list
+    if links:
+        parts.append('<h2>See also</h2><ul>' +
+                     ''.join(f'<li><a href="{href}">{href}</a></li>' for href in links) + '</ul>')
+    return '\n'.join(parts)
+
+
+def _layout(style: str, title: str, nav: str, content: str) -> str:
+    """Wrap page content in the markup each documentation platform produces"""
+    head = f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{title}</title></head><body>'
+    if style == 'docusaurus':
+        body = (f'<nav class="navbar">{nav}</nav><div class="main-wrapper"><aside class="theme-doc-sidebar-container">'
+                f'<nav class="menu">{nav}</nav></aside><main class="docMainContainer"><article>'
+                f'<div class="theme-doc-markdown markdown">{content}</div></article></main></div>'
+                f'<footer class="footer">Docs built with Docusaurus</footer>')
+    elif style == 'mkdocs':
+        body = (f'<header class="md-header">{title}</header><div class="md-container"><nav class="md-nav">{nav}</nav>'
+                f'<div class="md-content"><article class="md-content__inner md-typeset">{content}</article></div></div>'
+                f'<footer class="md-footer">Made with Material for MkDocs</footer>')
+    elif style == 'sphinx':
+        body = (f'<div class="related" role="navigation">{nav}</div><div class="document"><div class="body" role="main">'
+                f'<div class="section">{content}</div></div></div><div class="sphinxsidebar">{nav}</div>'
+                f'<div class="footer">Created using Sphinx</div>')
+    else:
+        body = (f'<div class="book"><div class="book-summary"><nav>{nav}</nav></div><div class="book-body">'
+                f'<div class="page-wrapper"><section class="normal markdown-section">{content}</section></div></div></div>')
+    return head + body + '</body></html>'
+
+
+def generate_site(style: str = 'docusaurus', pages: int = 200, page_kb: float = 20,
+                  links: int = 20, seed: int = 42) -> Dict[str, Tuple[str, bytes]]:
+    """Map every path of a synthetic site to (content type, body), including robots.txt and sitemap.xml.
+
+    Each page has about page_kb KB of content and `links` internal links in
+    its body, plus a navigation menu that links every section's first pages.
+    """
+    if style not in STYLES:
+        raise ValueError(f"Unknown site style: {style}")
+    rng = random.Random(seed)
+    paths = page_paths(style, pages)
+    nav = ''.join(f'<a href="{path}">{SECTIONS[i % len(SECTIONS)]}</a>'
+                  for i, path in enumerate(paths[1:len(SECTIONS) + 1], 1))
+
+    site = {}
+    for i, path in enumerate(paths):
+        title = 'Documentation home' if i == 0 else f'{_sentence(rng, 3)[:-1]} ({i})'
+        # The home page links the next pages in order so a crawl reaches every page
+        targets = paths[1:links + 1] if i == 0 else [
+            paths[(i + 1) % pages] if j == 0 else rng.choice(paths) for j in range(links)]
+        targets = [f'{target}#section-{rng.randint(0, 5)}' if rng.random() < 0.1 else target
+                   for target in targets]
+        html = _layout(style, title, nav, _content(rng, title, int(page_kb * 1024), targets))
+        site[path] = ('text/html; charset=utf-8', html.encode('utf-8'))
+
+    site['/robots.txt'] = ('text/plain', b'User-agent: *\nAllow: /\n')
+    lastmod = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    entries = ''.join(
+        f'<url><loc>{{base}}{path}</loc><lastmod>{(lastmod + timedelta(hours=i)).date().isoformat()}</lastmod>'
+        f'<priority>{1.0 if i == 0 else 0.5}</priority></url>'
+        for i, path in enumerate(paths))
+    site['/sitemap.xml'] = ('application/xml', (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</urlset>').encode('utf-8'))
+    return site
+
+
+class SiteServer:
+    """Serve a generated site on localhost, sleeping `latency` (+/- `jitter`) seconds per request.
+
+    The sitemap's {base} placeholder is filled in with the server's address.
+    Use as a context manager; `url` is the site's base URL.
+    """
+
+    def __init__(self, site: Dict[str, Tuple[str, bytes]], latency: float = 0.0,
+                 jitter: float = 0.0, port: int = 0, sitemap: bool = True):
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                delay = server.latency + (random.uniform(-server.jitter, server.jitter) if server.jitter else 0)
+                if delay > 0:
+                    time.sleep(delay)
+                item = server.site.get(self.path)
+                if item is None:
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                content_type, body = item
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self._httpd.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self._httpd.server_address[1]}'
+        self.site = dict(site)
+        if sitemap:
+            content_type, body = self.site['/sitemap.xml']
+            self.site['/sitemap.xml'] = (content_type, body.replace(b'{base}', self.url.encode()))
+        else:
+            self.site.pop('/sitemap.xml', None)
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> 'SiteServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a synthetic documentation site')
+    parser.add_argument('--style', choices=STYLES, default='docusaurus')
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--page-kb', type=float, default=20, help='Approximate content size per page')
+    parser.add_argument('--links', type=int, default=20, help='Internal links per page body')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds of delay per request')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Random +/- variation of the latency')
+    parser.add_argument('--no-sitemap', action='store_true', help='Serve no sitemap, so the site must be crawled')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+
+    site = generate_site(args.style, args.pages, args.page_kb, args.links)
+    server = SiteServer(site, args.latency, args.jitter, args.port, sitemap=not args.no_sitemap)
+    print(f"Serving {args.pages} {args.style} pages on {server.url}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -3,65 +3,221 @@
 Web interface for Universal Documentation Scraper
 """
 
-from flask import Flask, render_template, request, jsonify, send_file, session
+from flask import Flask, Response, render_template, request, jsonify, send_file, session, stream_with_context
 import sys
 import os
 import json
+import logging
 import threading
-import queue
 import time
+import shutil
+from collections import OrderedDict, deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
-import zipfile
-import io
 import secrets
 
 # Add parent directory to path to import scraper
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from scraper.universal_scraper import UniversalDocsScraper
+from scraper.checkpoint import CrawlCheckpoint
+from scraper.archive import archive_path, build_archive
+from scraper.httpcache import HttpCache
+from scraper.joblog import FINISHED_STATUSES, MAX_EVENTS, job_logger, release_logger
+from scraper.metrics import ScrapeMetrics
+from scraper.search import search
+from scraper.store import OUTPUT_FORMATS
 
 app = Flask(__name__)
 app.secret_key = secrets.token_hex(16)
 
-# Store scraping progress
-scraping_sessions = {}
+# Scrapes run on a fixed pool of workers; further jobs wait in its queue
+MAX_CONCURRENT_SCRAPES = int(os.environ.get('MAX_CONCURRENT_SCRAPES', 2))
+MAX_QUEUED_SCRAPES = int(os.environ.get('MAX_QUEUED_SCRAPES', 20))
+# Upper bound on fetch threads per scrape, whatever the client asks for
+MAX_CONCURRENCY = 16
+# Finished sessions and their output are removed once unused for SESSION_TTL
+# seconds, and least recently used first when there are more than MAX_SESSIONS
+SESSION_TTL = int(os.environ.get('SESSION_TTL', 3600))
+MAX_SESSIONS = int(os.environ.get('MAX_SESSIONS', 50))
+# Seconds between keep-alive comments on an idle event stream
+SSE_KEEPALIVE = 15
+# Response cache shared by all sessions; set HTTP_CACHE_DIR to an empty string to disable it
+HTTP_CACHE_DIR = os.environ.get('HTTP_CACHE_DIR', 'http_cache')
+HTTP_CACHE_MAX_MB = int(os.environ.get('HTTP_CACHE_MAX_MB', 512))
+
+http_cache = HttpCache(HTTP_CACHE_DIR, HTTP_CACHE_MAX_MB * 1024 * 1024) if HTTP_CACHE_DIR else None
+
+# Stage timings and counters of every scrape since the app started, served at /metrics
+app_metrics = ScrapeMetrics()
+
+scrape_pool = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_SCRAPES, thread_name_prefix='scrape-job')
+
+# Store scraping progress, least recently used first
+scraping_sessions = OrderedDict()
+sessions_lock = threading.Lock()
 
 class ScrapingSession:
+    """State of one scrape job plus a ring buffer of its events.
+    
+    Every change is recorded as a numbered event ('status', 'progress' or
+    'log') in a fixed-size buffer, which /events streams to clients and
+    /status summarizes.
+    """
+    
     def __init__(self, session_id):
         self.session_id = session_id
-        self.status = "initializing"
+        self.events = deque(maxlen=MAX_EVENTS)
+        self.last_event_id = 0
+        self._events_changed = threading.Condition()
+        self._status = "queued"
         self.progress = 0
         self.total_urls = 0
         self.scraped_urls = 0
-        self.logs = []
         self.output_dir = None
+        self.archive = None
         self.start_time = datetime.now()
         self.end_time = None
         self.error = None
+        self.job = None
+        self.scraper = None
+        self.cancel_event = threading.Event()
+        self.last_access = time.monotonic()
+        
+    @property
+    def finished(self):
+        return self.job is not None and self.job.done()
+    
+    @property
+    def status(self):
+        return self._status
+    
+    @status.setter
+    def status(self, status):
+        if status in FINISHED_STATUSES:
+            self.end_time = self.end_time or datetime.now()
+        self._status = status
+        self.emit('status', status=status, error=self.error,
+                  end_time=self.end_time.isoformat() if self.end_time else None)
+    
+    def emit(self, event_type, **data):
+        """Record an event and wake up the streams waiting for it"""
+        with self._events_changed:
+            self.last_event_id += 1
+            self.events.append({'id': self.last_event_id, 'type': event_type,
+                                'time': datetime.now().isoformat(), **data})
+            self._events_changed.notify_all()
+    
+    def events_after(self, last_id, timeout=None):
+        """Events newer than last_id, waiting up to timeout for one to arrive.
+        
+        Returns None when events after last_id have already dropped out of
+        the buffer, i.e. the caller needs a fresh snapshot.
+        """
+        with self._events_changed:
+            if self.last_event_id <= last_id and timeout:
+                self._events_changed.wait(timeout)
+            oldest = self.last_event_id - len(self.events) + 1
+            if not oldest - 1 <= last_id <= self.last_event_id:
+                return None
+            return list(islice(self.events, last_id - oldest + 1, None))
+    
+    def log(self, message, level='INFO'):
+        self.emit('log', level=level, message=message)
+    
+    def update_progress(self, url, ok, scraped_urls, total_urls):
+        self.scraped_urls = scraped_urls
+        self.total_urls = total_urls
+        self.progress = int((scraped_urls / total_urls) * 100)
+        self.emit('progress', url=url, ok=ok, scraped_urls=scraped_urls,
+                  total_urls=total_urls, progress=self.progress)
+        
+    def cancel(self):
+        """Stop the scrape: a queued job never starts, a running one stops fetching"""
+        self.cancel_event.set()
+        if self.job.cancel():
+            self.status = "cancelled"
+        scraper = self.scraper
+        if scraper is not None:
+            scraper.cancel()
         
     def to_dict(self):
+        with self._events_changed:
+            last_event_id = self.last_event_id
+            logs = [{'time': e['time'], 'message': e['message']}
+                    for e in self.events if e['type'] == 'log']
         return {
             'session_id': self.session_id,
             'status': self.status,
             'progress': self.progress,
             'total_urls': self.total_urls,
             'scraped_urls': self.scraped_urls,
-            'logs': self.logs[-50:],  # Last 50 log entries
+            'logs': logs[-50:],  # Last 50 log entries
             'start_time': self.start_time.isoformat(),
             'end_time': self.end_time.isoformat() if self.end_time else None,
-            'error': self.error
+            'error': self.error,
+            'last_event_id': last_event_id
         }
 
-class LogCapture:
+class SessionLogHandler(logging.Handler):
+    """Turns the records of one session's logger into 'log' events"""
+    
     def __init__(self, session):
+        super().__init__(logging.INFO)
         self.session = session
         
-    def write(self, message):
-        if message.strip():
-            self.session.logs.append({
-                'time': datetime.now().isoformat(),
-                'message': message.strip()
-            })
+    def emit(self, record):
+        try:
+            self.session.log(self.format(record), record.levelname)
+        except Exception:
+            self.handleError(record)
+
+def session_logger(session):
+    """A logger of the session's own, so its records reach no other session"""
+    logger = job_logger(f'scraper.sessions.{session.session_id}')
+    logger.addHandler(SessionLogHandler(session))
+    return logger
+
+def get_session(session_id):
+    """Look up a session, marking it as recently used"""
+    with sessions_lock:
+        session = scraping_sessions.get(session_id)
+        if session:
+            scraping_sessions.move_to_end(session_id)
+            session.last_access = time.monotonic()
+        return session
+
+def queued_sessions():
+    """Sessions waiting for a scrape worker, oldest first"""
+    with sessions_lock:
+        waiting = [s for s in scraping_sessions.values() if s.status == "queued" and not s.finished]
+    return sorted(waiting, key=lambda s: s.start_time)
+
+def evict_sessions():
+    """Forget finished sessions past their TTL or beyond MAX_SESSIONS, deleting their output"""
+    now = time.monotonic()
+    with sessions_lock:
+        evicted = [s for s in scraping_sessions.values()
+                   if s.finished and now - s.last_access > SESSION_TTL]
+        excess = len(scraping_sessions) - len(evicted) - MAX_SESSIONS
+        for s in scraping_sessions.values():
+            if excess <= 0:
+                break
+            if s.finished and s not in evicted:
+                evicted.append(s)
+                excess -= 1
+        for s in evicted:
+            del scraping_sessions[s.session_id]
+        # A directory resumed by a live session is no longer the evicted session's to delete
+        claimed = {s.output_dir for s in scraping_sessions.values() if s.output_dir}
+        archives = {s.archive for s in scraping_sessions.values() if s.archive}
+    
+    for s in evicted:
+        if s.output_dir and s.output_dir not in claimed:
+            shutil.rmtree(s.output_dir, ignore_errors=True)
+        if s.archive and s.archive not in archives:
+            s.archive.unlink(missing_ok=True)
 
 @app.route('/')
 def index():
@@ -71,82 +227,118 @@ def index():
 def start_scraping():
     data = request.json
     url = data.get('url')
-    rate_limit = float(data.get('rate_limit', 1.0))
-    max_pages = int(data.get('max_pages', 100))
+    try:
+        rate_limit = float(data.get('rate_limit', 1.0))
+        max_pages = int(data.get('max_pages', 100))
+        concurrency = int(data.get('concurrency', 1))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'rate_limit, max_pages and concurrency must be numbers'}), 400
+    concurrency = max(1, min(MAX_CONCURRENCY, concurrency))
+    resume = bool(data.get('resume', False))
+    output_format = data.get('output_format', 'files')
     
     if not url:
         return jsonify({'error': 'URL is required'}), 400
+    if output_format not in OUTPUT_FORMATS:
+        return jsonify({'error': f'Output format must be one of: {", ".join(OUTPUT_FORMATS)}'}), 400
+    
+    evict_sessions()
+    if len(queued_sessions()) >= MAX_QUEUED_SCRAPES:
+        return jsonify({'error': 'Too many scrapes waiting, try again later'}), 503
     
     # Create session
     session_id = secrets.token_urlsafe(16)
     scraping_session = ScrapingSession(session_id)
-    scraping_sessions[session_id] = scraping_session
-    
-    # Start scraping in background thread
-    thread = threading.Thread(
-        target=run_scraper,
-        args=(scraping_session, url, rate_limit, max_pages)
-    )
-    thread.start()
+    with sessions_lock:
+        scraping_sessions[session_id] = scraping_session
+        # Queue the job; it starts as soon as one of the scrape workers is free
+        scraping_session.job = scrape_pool.submit(
+            run_scraper, scraping_session, url, rate_limit, max_pages, concurrency, resume, output_format)
     
     return jsonify({'session_id': session_id})
 
-def run_scraper(session, url, rate_limit, max_pages):
+def find_resumable_output(url, exclude=()):
+    """Latest scraped_<domain>_* directory holding an unfinished scrape of url, if any"""
+    domain = url.split('/')[2].replace('www.', '')
+    for candidate in sorted(Path('.').glob(f"scraped_{domain}_*"), reverse=True):
+        if (candidate.is_dir() and str(candidate) not in exclude and
+                CrawlCheckpoint.exists_for(candidate, url.rstrip('/'))):
+            return str(candidate)
+    return None
+
+def claim_output_dir(session, url, resume):
+    """Pick the session's output directory, never one that another running scrape is using"""
+    with sessions_lock:
+        in_use = {s.output_dir for s in scraping_sessions.values()
+                  if s is not session and s.output_dir and not s.finished}
+        # Continue an unfinished scrape, or create a new output directory
+        output_dir = find_resumable_output(url, in_use) if resume else None
+        if output_dir is None:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            domain = url.split('/')[2].replace('www.', '')
+            output_dir = f"scraped_{domain}_{timestamp}"
+            suffix = 1
+            while output_dir in in_use:
+                suffix += 1
+                output_dir = f"scraped_{domain}_{timestamp}_{suffix}"
+        # A resumed directory changes hands: the finished session it came from must not delete it
+        for s in scraping_sessions.values():
+            if s is not session and s.output_dir == output_dir:
+                s.output_dir = None
+                s.archive = None
+        session.output_dir = output_dir
+    return output_dir
+
+def run_scraper(session, url, rate_limit, max_pages, concurrency=1, resume=False, output_format='files'):
+    if session.cancel_event.is_set():
+        session.status = "cancelled"
+        return
+    scraper = None
+    logger = session_logger(session)
     try:
         session.status = "discovering"
-        
-        # Create output directory
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        domain = url.split('/')[2].replace('www.', '')
-        output_dir = f"scraped_{domain}_{timestamp}"
-        session.output_dir = output_dir
+        output_dir = claim_output_dir(session, url, resume)
         
         # Initialize scraper
         scraper = UniversalDocsScraper(
             base_url=url,
             output_dir=output_dir,
             rate_limit=rate_limit,
-            max_pages=max_pages
+            max_pages=max_pages,
+            concurrency=concurrency,
+            resume=resume,
+            logger=logger,
+            http_cache=http_cache,
+            metrics=ScrapeMetrics(parent=app_metrics),
+            output_format=output_format,
+            search_index=True
         )
-        
-        # Capture logs
-        import logging
-        log_handler = logging.StreamHandler(LogCapture(session))
-        log_handler.setLevel(logging.INFO)
-        scraper.logger.addHandler(log_handler)
+        session.scraper = scraper
+        if session.cancel_event.is_set():
+            scraper.cancel()
         
         # Discover URLs
-        session.logs.append({
-            'time': datetime.now().isoformat(),
-            'message': f'Starting URL discovery for {url}'
-        })
-        
-        urls = scraper.get_sitemap_urls()
-        if not urls:
-            session.logs.append({
-                'time': datetime.now().isoformat(),
-                'message': 'No sitemap found, starting crawl discovery...'
-            })
-            urls = scraper.discover_urls_by_crawling()
-        
-        session.total_urls = len(urls)
+        session.log(f'Starting URL discovery for {url}')
+        
         session.status = "scraping"
         
-        # Scrape pages
-        for i, page_url in enumerate(urls):
-            if session.status == "cancelled":
+        # Scrape pages while they are being discovered
+        urls = []
+        pages = scraper.iter_pages()
+        for i, (page_url, ok) in enumerate(pages, 1):
+            if session.cancel_event.is_set():
                 break
                 
-            session.scraped_urls = i
-            session.progress = int((i / len(urls)) * 100)
-            
-            scraper.scrape_page(page_url)
-            
-            if scraper.scraped_count >= max_pages:
-                break
+            urls.append(page_url)
+            session.update_progress(page_url, ok, i, max(min(scraper.discovered_count, max_pages), i))
         
-        session.status = "completed"
-        session.end_time = datetime.now()
+        if session.cancel_event.is_set():
+            # Leave the checkpoint unfinished so the scrape can be resumed
+            pages.close()
+            session.status = "cancelled"
+            return
+        
+        urls = [page_url for page_url, _ in scraper.resumed] + urls
         
         # Save summary
         scraper.save_summary(urls, scraper.scraped_count)
@@ -155,62 +347,149 @@ def run_scraper(session, url, rate_limit, max_pages):
         if scraper.scraped_count > 0:
             scraper.create_combined_markdown()
         
+        # Zip the results once, so every download is served from the same file
+        scraper.close()
+        session.log("Creating download archive...")
+        session.archive = build_archive(output_dir, archive_path(output_dir).absolute())
+        
+        session.status = "completed"
+        
     except Exception as e:
-        session.status = "error"
         session.error = str(e)
-        session.end_time = datetime.now()
         import traceback
-        session.logs.append({
-            'time': datetime.now().isoformat(),
-            'message': f'Error: {traceback.format_exc()}'
-        })
+        session.log(f'Error: {traceback.format_exc()}', 'ERROR')
+        session.status = "error"
+    finally:
+        session.scraper = None
+        session.last_access = time.monotonic()
+        if scraper is not None:
+            scraper.close()
+        release_logger(logger)
 
 @app.route('/status/<session_id>')
 def get_status(session_id):
-    session = scraping_sessions.get(session_id)
+    evict_sessions()
+    session = get_session(session_id)
     if not session:
         return jsonify({'error': 'Session not found'}), 404
     
-    return jsonify(session.to_dict())
+    return jsonify(session_status(session))
+
+def session_status(session):
+    """The session as a dict, with its place in the queue while it waits"""
+    status = session.to_dict()
+    if session.status == "queued":
+        waiting = queued_sessions()
+        status['queue_position'] = waiting.index(session) + 1 if session in waiting else None
+    return status
+
+@app.route('/events/<session_id>')
+def stream_events(session_id):
+    """Server-sent events: a 'snapshot' of the session, then every event as it happens.
+    
+    A reconnecting EventSource sends Last-Event-ID and continues where it
+    left off, or gets a new snapshot if it fell too far behind.
+    """
+    session = get_session(session_id)
+    if not session:
+        return jsonify({'error': 'Session not found'}), 404
+    last_id = request.headers.get('Last-Event-ID', type=int)
+    
+    def format_event(event_type, data, event_id):
+        return f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data)}\n\n"
+    
+    def generate():
+        nonlocal last_id
+        events = session.events_after(last_id) if last_id is not None else None
+        while True:
+            if events is None:
+                snapshot = session_status(session)
+                last_id = snapshot['last_event_id']
+                yield format_event('snapshot', snapshot, last_id)
+            elif events:
+                for event in events:
+                    yield format_event(event['type'], event, event['id'])
+                last_id = events[-1]['id']
+            elif session.finished:
+                return
+            else:
+                yield ": keep-alive\n\n"
+            events = session.events_after(last_id, timeout=SSE_KEEPALIVE)
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/download/<session_id>')
 def download_results(session_id):
-    session = scraping_sessions.get(session_id)
+    session = get_session(session_id)
     if not session:
         return jsonify({'error': 'Session not found'}), 404
     
     if session.status != "completed":
         return jsonify({'error': 'Scraping not completed'}), 400
     
-    if not session.output_dir or not os.path.exists(session.output_dir):
-        return jsonify({'error': 'Output directory not found'}), 404
-    
-    # Create zip file in memory
-    memory_file = io.BytesIO()
-    
-    with zipfile.ZipFile(memory_file, 'w', zipfile.ZIP_DEFLATED) as zf:
-        for root, dirs, files in os.walk(session.output_dir):
-            for file in files:
-                file_path = os.path.join(root, file)
-                arcname = os.path.relpath(file_path, session.output_dir)
-                zf.write(file_path, arcname)
-    
-    memory_file.seek(0)
+    if not session.archive or not session.archive.is_file():
+        return jsonify({'error': 'Archive not found'}), 404
     
+    # Streamed from disk, with ETag/If-None-Match and Range support for resumed downloads
     return send_file(
-        memory_file,
+        session.archive,
         mimetype='application/zip',
         as_attachment=True,
-        download_name=f'{session.output_dir}.zip'
+        download_name=f'{session.output_dir}.zip',
+        conditional=True,
+        etag=True,
+        max_age=0
     )
 
+@app.route('/search/<session_id>')
+def search_results(session_id):
+    """Ranked sections of the session's pages matching ?q=, with highlighted snippets.
+    
+    Works while the scrape is still running; pages show up in batches as
+    the index is committed.
+    """
+    session = get_session(session_id)
+    if not session:
+        return jsonify({'error': 'Session not found'}), 404
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Query parameter q is required'}), 400
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    
+    start = time.perf_counter()
+    try:
+        results = search(session.output_dir, query, limit, offset) if session.output_dir else None
+    except FileNotFoundError:
+        results = None
+    if results is None:
+        return jsonify({'error': 'Nothing has been indexed yet'}), 404
+    return jsonify({
+        'query': query,
+        'results': results,
+        'took_ms': round((time.perf_counter() - start) * 1000, 1)
+    })
+
+@app.route('/metrics')
+def metrics():
+    """Scraper stage histograms and counters, plus session gauges, for Prometheus"""
+    with sessions_lock:
+        statuses = [session.status for session in scraping_sessions.values()]
+    lines = ['# HELP docs_scraper_sessions Scrape sessions currently held, by status.',
+             '# TYPE docs_scraper_sessions gauge']
+    for status in sorted(set(statuses)):
+        lines.append(f'docs_scraper_sessions{{status="{status}"}} {statuses.count(status)}')
+    return Response(app_metrics.to_prometheus() + '\n'.join(lines) + '\n',
+                    mimetype='text/plain; version=0.0.4')
+
 @app.route('/cancel/<session_id>', methods=['POST'])
 def cancel_scraping(session_id):
-    session = scraping_sessions.get(session_id)
+    session = get_session(session_id)
     if not session:
         return jsonify({'error': 'Session not found'}), 404
     
-    session.status = "cancelled"
+    session.cancel()
     return jsonify({'status': 'cancelled'})
 
 if __name__ == '__main__':
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Download archives for the Universal Documentation Scraper.
+Zips an output directory to disk once, so downloads are served from the file.
+"""
+
+import os
+import zipfile
+from pathlib import Path
+from typing import Optional, Union
+
+from scraper.checkpoint import CrawlCheckpoint
+from scraper.manifest import PageManifest
+from scraper.search import SearchIndex
+
+# Scraper state kept in the output directory for resumes, re-runs and search; not part of the docs
+INTERNAL_FILES = (CrawlCheckpoint.FILENAME, PageManifest.FILENAME, SearchIndex.FILENAME)
+# SQLite sidecars of the above
+INTERNAL_SUFFIXES = ('', '-wal', '-shm', '-journal')
+
+
+def is_internal(relative_path: str) -> bool:
+    """True for scraper state files (and their temporaries) that downloads leave out"""
+    return any(relative_path == filename + suffix or relative_path == str(Path(filename).with_suffix('.tmp'))
+               for filename in INTERNAL_FILES for suffix in INTERNAL_SUFFIXES)
+
+
+def archive_path(output_dir: Union[str, Path]) -> Path:
+    """Where the archive of output_dir is kept: <output_dir>.zip next to it"""
+    output_dir = Path(output_dir)
+    return output_dir.with_name(output_dir.name + '.zip')
+
+
+def build_archive(output_dir: Union[str, Path], destination: Optional[Path] = None) -> Path:
+    """Zip the files of output_dir, leaving out the scraper's own state, and return the archive's path.
+
+    Files are compressed straight from disk into a temporary file, so memory
+    use does not depend on the size of the scrape. The temporary file only
+    replaces destination once it is complete, so a download never sees a
+    partial archive.
+    """
+    output_dir = Path(output_dir)
+    destination = Path(destination or archive_path(output_dir))
+    partial = destination.with_name(destination.name + '.part')
+    try:
+        with zipfile.ZipFile(partial, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for root, dirs, files in os.walk(output_dir):
+                dirs.sort()
+                for file in sorted(files):
+                    file_path = os.path.join(root, file)
+                    relative_path = os.path.relpath(file_path, output_dir)
+                    if not is_internal(relative_path):
+                        zf.write(file_path, relative_path)
+        os.replace(partial, destination)
+    finally:
+        partial.unlink(missing_ok=True)
+    return destination
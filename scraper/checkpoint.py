@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Crawl checkpoints for the Universal Documentation Scraper.
+Persists the frontier, the visited set and per-URL outcomes so an interrupted scrape can resume.
+"""
+
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+QUEUED = 'queued'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class CrawlCheckpoint:
+    """SQLite record of every URL a scrape has queued or finished.
+
+    Updates are buffered in memory and written in one transaction every
+    `flush_interval` seconds or `flush_every` updates, so checkpointing costs
+    a handful of small writes per minute rather than one per page. A crash
+    loses at most the last unflushed batch, and pages in it are simply
+    fetched again on resume. Callers whose own checkpoint work grows with
+    the crawl can raise `min_interval` to space flushes further apart.
+    """
+
+    FILENAME = 'crawl_state.sqlite'
+
+    def __init__(self, output_dir: Path, flush_interval: float = 5.0, flush_every: int = 100):
+        self.path = Path(output_dir) / self.FILENAME
+        self.flush_interval = flush_interval
+        self.flush_every = flush_every
+        self.min_interval = 0.0
+        self._queued: List[Tuple[str, Optional[int]]] = []
+        self._finished: List[Tuple[str, str]] = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS urls '
+                           '(url TEXT PRIMARY KEY, depth INTEGER, state TEXT NOT NULL)')
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, **values):
+        self._conn.executemany('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                               [(key, str(value)) for key, value in values.items()])
+
+    @classmethod
+    def exists_for(cls, output_dir: Path, base_url: str) -> bool:
+        """True if output_dir holds an unfinished scrape of base_url, without creating anything"""
+        if not (Path(output_dir) / cls.FILENAME).is_file():
+            return False
+        checkpoint = cls(output_dir)
+        try:
+            return checkpoint.is_resumable(base_url)
+        finally:
+            checkpoint.close()
+
+    def is_resumable(self, base_url: str) -> bool:
+        """True if this directory holds an unfinished scrape of base_url"""
+        with self._lock:
+            return (self._meta('base_url') == base_url and self._meta('complete') == '0' and
+                    self._conn.execute('SELECT 1 FROM urls LIMIT 1').fetchone() is not None)
+
+    def start(self, base_url: str, resume: bool = False) -> bool:
+        """Begin a scrape; returns True when continuing an unfinished one.
+
+        Without resume (or with nothing to resume) the previous state is cleared.
+        """
+        resuming = resume and self.is_resumable(base_url)
+        with self._lock:
+            self._queued.clear()
+            self._finished.clear()
+            if not resuming:
+                self._conn.execute('DELETE FROM urls')
+                self._set_meta(base_url=base_url, started_at=datetime.now().isoformat())
+            self._set_meta(complete=0)
+        return resuming
+
+    def states(self) -> Dict[str, Tuple[str, Optional[int]]]:
+        """url -> (state, depth) for every URL recorded so far"""
+        with self._lock:
+            return {url: (state, depth) for url, depth, state
+                    in self._conn.execute('SELECT url, depth, state FROM urls')}
+
+    def queue(self, url: str, depth: Optional[int] = None):
+        """Record a URL added to the frontier"""
+        with self._lock:
+            self._queued.append((url, depth))
+
+    def mark(self, url: str, ok: bool):
+        """Record that a URL was finished, successfully or not"""
+        with self._lock:
+            self._finished.append((url, DONE if ok else FAILED))
+
+    def due(self) -> bool:
+        """True when enough has changed or enough time has passed to flush"""
+        with self._lock:
+            pending = len(self._queued) + len(self._finished)
+            elapsed = time.monotonic() - self._last_flush
+            return (pending > 0 and elapsed >= self.min_interval and
+                    (pending >= self.flush_every or elapsed >= self.flush_interval))
+
+    def flush(self):
+        """Write buffered updates in a single transaction"""
+        with self._lock:
+            queued, self._queued = self._queued, []
+            finished, self._finished = self._finished, []
+            self._last_flush = time.monotonic()
+            if not queued and not finished:
+                return
+            with self._conn:
+                self._conn.execute('BEGIN')
+                self._conn.executemany('INSERT OR IGNORE INTO urls (url, depth, state) VALUES (?, ?, ?)',
+                                       [(url, depth, QUEUED) for url, depth in queued])
+                self._conn.executemany('INSERT INTO urls (url, state) VALUES (?, ?) '
+                                       'ON CONFLICT(url) DO UPDATE SET state = excluded.state',
+                                       finished)
+
+    def finish(self):
+        """Flush and mark the scrape as complete, so it is not offered for resuming"""
+        self.flush()
+        with self._lock:
+            self._set_meta(complete=1, finished_at=datetime.now().isoformat())
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Heading-aware chunk export for retrieval pipelines.
+Splits saved pages into bounded-size chunks along their markdown sections and
+streams them as JSON lines while the scrape runs.
+"""
+
+import hashlib
+import json
+import sys
+import threading
+from typing import Iterator, List, Optional, TextIO
+
+from scraper.search import FENCE_RE, split_sections
+
+# Default upper bound of a chunk's text, in characters (roughly 500 tokens)
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def _blocks(text: str) -> List[str]:
+    """Paragraph-level blocks of a section; fenced code blocks are kept whole"""
+    blocks: List[str] = []
+    current: List[str] = []
+    in_fence = False
+    for line in text.split('\n'):
+        if FENCE_RE.match(line):
+            in_fence = not in_fence
+        if not in_fence and not line.strip():
+            if current:
+                blocks.append('\n'.join(current))
+                current = []
+            continue
+        current.append(line)
+    if current:
+        blocks.append('\n'.join(current))
+    return blocks
+
+
+def _split_block(block: str, size: int) -> Iterator[str]:
+    """Pieces of an oversized block, cut at line breaks and only mid-line when a line is too long"""
+    piece = ''
+    for line in block.split('\n'):
+        while len(line) > size:
+            if piece:
+                yield piece
+                piece = ''
+            yield line[:size]
+            line = line[size:]
+        if piece and len(piece) + 1 + len(line) > size:
+            yield piece
+            piece = ''
+        piece = f'{piece}\n{line}' if piece else line
+    if piece:
+        yield piece
+
+
+def split_text(text: str, size: int = DEFAULT_CHUNK_SIZE) -> List[str]:
+    """Cut a section's text into pieces of at most size characters at paragraph boundaries"""
+    pieces: List[str] = []
+    current = ''
+    for block in _blocks(text):
+        if len(block) > size:
+            if current:
+                pieces.append(current)
+                current = ''
+            pieces.extend(_split_block(block, size))
+        elif current and len(current) + 2 + len(block) > size:
+            pieces.append(current)
+            current = block
+        else:
+            current = f'{current}\n\n{block}' if current else block
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_page(url: str, title: str, document: str, size: int = DEFAULT_CHUNK_SIZE) -> List[dict]:
+    """Chunks of a saved page's markdown document, in page order.
+
+    Every chunk stays within one section and records the section's heading
+    path. IDs hash the URL, heading path and text only (not the scrape
+    time), so an unchanged page yields the same IDs on every run; the
+    page_hash likewise lets consumers skip whole pages they already have.
+    """
+    chunks = []
+    seen = {}
+    for headings, text in split_sections(document):
+        for piece in split_text(text, size):
+            key = '\0'.join((url, *headings, piece))
+            # Identical text twice under the same headings still needs distinct IDs
+            occurrence = seen.get(key, 0)
+            seen[key] = occurrence + 1
+            if occurrence:
+                key += f'\0{occurrence}'
+            chunks.append({
+                'id': hashlib.sha256(key.encode('utf-8')).hexdigest()[:24],
+                'url': url,
+                'title': title,
+                'heading_path': list(headings),
+                'text': piece
+            })
+    page_hash = hashlib.sha256('\0'.join(chunk['id'] for chunk in chunks).encode('ascii')).hexdigest()[:24]
+    for i, chunk in enumerate(chunks):
+        chunk.update(chunk_index=i, chunk_count=len(chunks), page_hash=page_hash)
+    return chunks
+
+
+class ChunkWriter:
+    """JSONL stream of chunks, one line per chunk, written page by page.
+
+    Each page's chunks are written and flushed together, so a consumer
+    tailing the file (or reading stdout with path '-') only ever sees whole
+    pages. With append, an existing file is continued (for --resume).
+    """
+
+    def __init__(self, path: str, size: int = DEFAULT_CHUNK_SIZE, append: bool = False):
+        self.path = path
+        self.size = size
+        self.pages = 0
+        self.chunks = 0
+        self._lock = threading.Lock()
+        self._file: Optional[TextIO] = sys.stdout if path == '-' else open(
+            path, 'a' if append else 'w', encoding='utf-8')
+
+    def write_page(self, url: str, title: str, document: str) -> int:
+        """Chunk a page and append its chunks to the stream; returns how many were written"""
+        chunks = chunk_page(url, title, document, self.size)
+        lines = ''.join(json.dumps(chunk, ensure_ascii=False) + '\n' for chunk in chunks)
+        with self._lock:
+            self._file.write(lines)
+            self._file.flush()
+            self.pages += 1
+            self.chunks += len(chunks)
+        return len(chunks)
+
+    def to_dict(self) -> dict:
+        return {'path': self.path, 'pages': self.pages, 'chunks': self.chunks, 'chunk_size': self.size}
+
+    def close(self):
+        with self._lock:
+            if self._file is not None and self._file is not sys.stdout:
+                self._file.close()
+            self._file = None
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Combined document builder for the Universal Documentation Scraper.
+Collects pages into one append-only stream while they are saved, then writes
+COMBINED_DOCUMENTATION.md in a single pass without re-reading or re-parsing pages.
+"""
+
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Tuple
+
+from scraper.store import FileStore
+
+SEPARATOR = '=' * 80
+
+
+class CombinedDocument:
+    """Append-only stream of page contents plus a small index of where each one sits.
+
+    Pages saved in this run are appended to a scratch stream as they are
+    written. The final document is assembled from (filename, title) pairs
+    that the caller already holds in memory: each section is a byte-range
+    copy out of the stream, or, for pages kept from an earlier run, a plain
+    copy of the page out of the page store. Nothing is parsed, so the finalize cost is one
+    header per page plus sequential copying.
+    """
+
+    FILENAME = 'COMBINED_DOCUMENTATION.md'
+    STREAM_FILENAME = '.combined.parts'
+
+    def __init__(self, output_dir: Path, store=None):
+        self.output_dir = Path(output_dir)
+        self.store = store or FileStore(output_dir)
+        self.path = self.output_dir / self.FILENAME
+        self.stream_path = self.output_dir / self.STREAM_FILENAME
+        self._stream = None
+        self._index: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, filename: str, content: str):
+        """Append the full text of a page that was just saved as filename"""
+        data = content.encode('utf-8')
+        with self._lock:
+            if self._stream is None:
+                self._stream = open(self.stream_path, 'w+b')
+            offset = self._stream.seek(0, 2)
+            self._stream.write(data)
+            # A later save of the same file supersedes the earlier one
+            self._index[filename] = (offset, len(data))
+
+    def finalize(self, base_url: str, pages: Iterable[Tuple[str, str]]) -> int:
+        """Write the combined document for the given (filename, title) pages, in filename order.
+
+        Returns the number of pages included. The scratch stream is removed
+        afterwards.
+        """
+        with self._lock:
+            stream, index = self._stream, self._index
+            self._stream, self._index = None, {}
+        pages = sorted((filename, title) for filename, title in pages
+                       if filename not in (self.FILENAME, 'README.md') and
+                       (filename in index or self.store.contains(filename)))
+
+        try:
+            if stream is not None:
+                stream.flush()
+            with open(self.path, 'wb') as combined:
+                combined.write(f"""# Combined Documentation - {base_url}
+
+Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+Total files: {len(pages)}
+
+---
+
+""".encode('utf-8'))
+
+                for i, (filename, title) in enumerate(pages, 1):
+                    combined.write(f"\n\n{SEPARATOR}\n## [{i}] {title}\nSource: {filename}\n"
+                                   f"{SEPARATOR}\n\n".encode('utf-8'))
+                    if filename in index:
+                        offset, length = index[filename]
+                        stream.seek(offset)
+                        combined.write(stream.read(length))
+                    else:
+                        combined.write(self.store.read(filename) or b'')
+                    combined.write(b"\n\n")
+        finally:
+            if stream is not None:
+                stream.close()
+                self.stream_path.unlink(missing_ok=True)
+        return len(pages)
+
+    def close(self):
+        """Drop the scratch stream without writing the document, e.g. after a cancelled run"""
+        with self._lock:
+            stream, self._stream, self._index = self._stream, None, {}
+        if stream is not None:
+            stream.close()
+        self.stream_path.unlink(missing_ok=True)
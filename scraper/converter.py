@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+HTML-to-markdown conversion stage for the Universal Documentation Scraper.
+Plain functions over picklable inputs, so pages can be converted in worker processes.
+"""
+
+import re
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+import markdownify
+import soupsieve
+from bs4 import BeautifulSoup, Tag
+
+from scraper.dedup import fingerprint
+from scraper.links import internal_links
+
+
+# How to recognize each docs platform, and its extra chrome to strip from content
+PLATFORMS = {
+    'docusaurus': {
+        'generator': 'docusaurus',
+        'markers': ['.theme-doc-markdown', '#__docusaurus'],
+        'remove': ['.hash-link', '.theme-doc-toc-mobile', '.pagination-nav']
+    },
+    'mkdocs': {
+        'generator': 'mkdocs',
+        'markers': ['.md-content', '.md-container'],
+        'remove': ['.headerlink', '.md-source-file']
+    },
+    'gitbook': {
+        'generator': 'gitbook',
+        'markers': ['.gitbook-root', '.book-summary', '.markdown-section'],
+        'remove': []
+    },
+    'sphinx': {
+        'generator': 'docutils',
+        'markers': ['.sphinxsidebar', '[role="main"].body', '.rst-content'],
+        'remove': ['.headerlink']
+    },
+    'readme': {
+        'generator': 'readme',
+        'markers': ['.readme-content', '[data-testid="readme-content"]', '.hub-content-body'],
+        'remove': []
+    }
+}
+
+
+# Default main-content selectors, tried in order (UniversalDocsScraper.content_selectors)
+CONTENT_SELECTORS = (
+    # Readme.com
+    '.readme-content', '[data-testid="readme-content"]', '.hub-content-body',
+    # GitBook
+    '.markdown-section', '.page-wrapper',
+    # Docusaurus
+    '.markdown', 'article', '.docMainContainer',
+    # MkDocs
+    '.md-content', '.content',
+    # Sphinx
+    '.document', '.body',
+    # Generic
+    'main', '[role="main"]', '.main-content', '.documentation-content',
+    '#content', '.content-wrapper'
+)
+
+# Default elements removed before conversion (UniversalDocsScraper.remove_selectors)
+REMOVE_SELECTORS = (
+    'nav', 'header', 'footer', '.sidebar', '.navigation', '.toc',
+    '.breadcrumbs', '.edit-page', '.feedback', '.rating',
+    '[class*="sidebar"]', '[class*="navigation"]', '[class*="footer"]'
+)
+
+
+# markdownify settings shared by every conversion engine
+MARKDOWN_OPTIONS = {
+    'heading_style': "ATX",
+    'bullets': "-",
+    'code_language': "",
+    'strip': ['img', 'script', 'style']
+}
+
+# 'markdownify' serializes the content subtree and lets markdownify reparse it;
+# 'tree' converts the already-parsed subtree in place
+MARKDOWN_ENGINES = ('markdownify', 'tree')
+HTML_PARSERS = ('html.parser', 'lxml')
+
+
+class RenderOptions(NamedTuple):
+    """Everything render_page needs besides the page itself"""
+    content_selectors: Sequence[str]
+    remove_selectors: Sequence[str]
+    base_prefix: str
+    ignore_query: bool = False
+    collect_links: bool = False
+    # Cached site profile: content selector to try first, and the removal set to apply inside it
+    profile_selector: Optional[str] = None
+    profile_remove: Sequence[str] = ()
+    markdown_engine: str = 'tree'
+    parser: str = 'html.parser'
+
+
+@lru_cache(maxsize=64)
+def compile_selector(selectors: Tuple[str, ...]):
+    """Compile a group of CSS selectors once per process into a single matcher"""
+    return soupsieve.compile(', '.join(selectors))
+
+
+def detect_platform(soup: BeautifulSoup) -> Optional[str]:
+    """Guess which documentation platform generated a page"""
+    generator = soup.find('meta', attrs={'name': 'generator'})
+    if generator and generator.get('content'):
+        content = generator['content'].lower()
+        for platform, signature in PLATFORMS.items():
+            if signature['generator'] in content:
+                return platform
+
+    for platform, signature in PLATFORMS.items():
+        if compile_selector(tuple(signature['markers'])).select_one(soup):
+            return platform
+    return None
+
+
+class SiteProfile:
+    """Content selector and removal set learned from the first pages of a site.
+
+    While sampling, pages go through the full generic selector chain and
+    report which content selector won. Once the sample agrees, that selector
+    (plus the platform's extra removals) is handed to every later page, whose
+    removal pass then runs only inside the chosen content subtree. Pages where
+    the cached selector finds nothing fall back to the generic chain.
+    """
+
+    def __init__(self, remove_selectors: Sequence[str], sample_size: int = 3):
+        self.remove_selectors = tuple(remove_selectors)
+        self.sample_size = sample_size
+        self.platform: Optional[str] = None
+        self.selector: Optional[str] = None
+        self.hits = 0
+        self.fallbacks = 0
+        self._samples: List[Tuple[Optional[str], Optional[str]]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def remove(self) -> Tuple[str, ...]:
+        extra = PLATFORMS[self.platform]['remove'] if self.platform else []
+        return self.remove_selectors + tuple(extra)
+
+    def observe(self, platform: Optional[str], selector: Optional[str],
+                used_profile: Optional[bool]):
+        """Record which platform and content selector a rendered page ended up with.
+
+        used_profile is None when the page was rendered without a profile,
+        and False when the cached selector missed and the generic chain ran.
+        """
+        with self._lock:
+            if used_profile is not None:
+                if used_profile:
+                    self.hits += 1
+                else:
+                    self.fallbacks += 1
+                return
+            if self.selector is not None:
+                return
+
+            self._samples.append((platform, selector))
+            if len(self._samples) < self.sample_size:
+                return
+
+            (winner, votes), = Counter(s for _, s in self._samples).most_common(1)
+            if winner and winner != 'body' and votes * 2 > len(self._samples):
+                platforms = Counter(p for p, _ in self._samples if p)
+                self.platform = platforms.most_common(1)[0][0] if platforms else None
+                self.selector = winner
+            else:
+                # No stable winner yet; keep sampling a sliding window
+                self._samples.pop(0)
+
+    def to_dict(self) -> dict:
+        return {
+            'platform': self.platform,
+            'content_selector': self.selector,
+            'profile_hits': self.hits,
+            'fallbacks': self.fallbacks
+        }
+
+
+def extract_links(soup: BeautifulSoup, page_url: str, base_prefix: str,
+                  ignore_query: bool = False) -> List[str]:
+    """Return the canonical internal, non-binary links found on a page"""
+    base = soup.find('base', href=True)
+    return internal_links((link['href'] for link in soup.find_all('a', href=True)), page_url,
+                          base['href'] if base else None, base_prefix, ignore_query)
+
+
+def extract_content(soup: BeautifulSoup, content_selectors: Sequence[str],
+                    remove_selectors: Sequence[str]) -> Optional[BeautifulSoup]:
+    """Extract main content from the page"""
+    return _extract_generic(soup, content_selectors, remove_selectors)[0]
+
+
+def _extract_generic(soup: BeautifulSoup, content_selectors: Sequence[str],
+                     remove_selectors: Sequence[str]) -> Tuple[Optional[BeautifulSoup], Optional[str]]:
+    """Full selector chain over the whole document; also returns the selector that matched"""
+    # First, remove unwanted elements
+    if remove_selectors:
+        for elem in compile_selector(tuple(remove_selectors)).select(soup):
+            elem.decompose()
+
+    # Try to find main content
+    for selector in content_selectors:
+        content = compile_selector((selector,)).select_one(soup)
+        if content:
+            return content, selector
+
+    # Fallback: use body
+    return soup.find('body'), 'body'
+
+
+def _extract_profiled(soup: BeautifulSoup, options: RenderOptions) -> Optional[BeautifulSoup]:
+    """Cached-profile path: pick the known content element, then clean only inside it"""
+    content = compile_selector((options.profile_selector,)).select_one(soup)
+    if content is not None and options.profile_remove:
+        for elem in compile_selector(tuple(options.profile_remove)).select(content):
+            elem.decompose()
+    return content
+
+
+@lru_cache(maxsize=1)
+def _tree_converter() -> markdownify.MarkdownConverter:
+    """One converter per process; it keeps no per-document state"""
+    return markdownify.MarkdownConverter(**MARKDOWN_OPTIONS)
+
+
+def to_markdown(element: Tag, engine: str = 'markdownify') -> str:
+    """Convert a parsed element to markdown with the selected engine.
+
+    Both engines produce the same text: the tree engine runs markdownify's
+    converter over the element directly and applies the newline trimming
+    markdownify does for a whole document, skipping str() and the second parse.
+    """
+    if engine == 'tree':
+        return _tree_converter().convert_soup(element).strip('\n')
+    return markdownify.markdownify(str(element), **MARKDOWN_OPTIONS)
+
+
+def render_page(content: bytes, url: str, options: RenderOptions) -> dict:
+    """Parse a page and convert its main content to markdown.
+
+    Returns a dict with the page title, the cleaned markdown (None when no
+    content was found) with its duplicate-detection fingerprint, if
+    requested the page's internal links, and the seconds spent per stage.
+    """
+    timings = {}
+    start = time.perf_counter()
+    soup = BeautifulSoup(content, options.parser)
+    timings['parse'] = time.perf_counter() - start
+
+    links = []
+    if options.collect_links:
+        # Read links before navigation elements are stripped
+        links = extract_links(soup, url, options.base_prefix, options.ignore_query)
+
+    # Extract title
+    title = "Untitled"
+    title_elem = soup.find('title')
+    if title_elem:
+        title = title_elem.get_text().strip()
+
+    # Extract main content, via the cached site profile when there is one
+    main = None
+    used_profile = None
+    platform = None
+    selector = options.profile_selector
+    if options.profile_selector:
+        main = _extract_profiled(soup, options)
+        used_profile = main is not None
+    if main is None:
+        # The platform's extra removals apply here too, so a page comes out the same
+        # whether it is converted while sampling, after a fallback or via the profile
+        platform = detect_platform(soup)
+        remove = tuple(options.remove_selectors) + tuple(PLATFORMS[platform]['remove'] if platform else ())
+        main, selector = _extract_generic(soup, options.content_selectors, remove)
+
+    timings['extract'] = time.perf_counter() - start - timings['parse']
+    result = {'title': title, 'markdown': None, 'fingerprint': None, 'links': links,
+              'platform': platform, 'selector': selector, 'used_profile': used_profile,
+              'timings': timings}
+    if not main:
+        return result
+
+    # Convert to markdown
+    start = time.perf_counter()
+    markdown_content = to_markdown(main, options.markdown_engine)
+
+    # Clean up markdown
+    markdown_content = re.sub(r'\n\s*\n\s*\n', '\n\n', markdown_content)
+    markdown_content = markdown_content.strip()
+    timings['convert'] = time.perf_counter() - start
+
+    result['markdown'] = markdown_content
+    start = time.perf_counter()
+    result['fingerprint'] = fingerprint(markdown_content)
+    timings['fingerprint'] = time.perf_counter() - start
+    return result
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Duplicate detection for the Universal Documentation Scraper.
+Recognizes pages whose content was already saved under another URL, exactly or nearly.
+"""
+
+import hashlib
+import re
+import threading
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+TOKEN_RE = re.compile(r'\w+')
+
+SIMHASH_BITS = 64
+# Two documents whose fingerprints differ in at most this many bits are near-duplicates
+MAX_DISTANCE = 3
+# Split fingerprints into MAX_DISTANCE + 1 bands: near-duplicates share at least one band exactly
+BANDS = MAX_DISTANCE + 1
+BAND_BITS = SIMHASH_BITS // BANDS
+# Pages shorter than this are too small for a meaningful near-duplicate comparison
+MIN_TOKENS = 50
+SHINGLE_SIZE = 3
+# A SimHash match is only a candidate: it is dropped once its shingles overlap the kept page's this much
+MIN_SIMILARITY = 0.9
+
+
+def text_hash(markdown: str) -> str:
+    """Fingerprint of the extracted text, insensitive to whitespace differences"""
+    return hashlib.sha256(' '.join(markdown.split()).encode('utf-8')).hexdigest()
+
+
+def _shingles(tokens: List[str]) -> Set[str]:
+    return {' '.join(tokens[i:i + SHINGLE_SIZE]) for i in range(max(1, len(tokens) - SHINGLE_SIZE + 1))}
+
+
+def similarity(markdown: str, other: str) -> float:
+    """Jaccard similarity of the word shingles of two texts"""
+    a = _shingles(TOKEN_RE.findall(markdown.lower()))
+    b = _shingles(TOKEN_RE.findall(other.lower()))
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def simhash(tokens: List[str]) -> int:
+    """64-bit SimHash over the distinct word shingles of the given tokens.
+
+    Each shingle counts once, so boilerplate repeated throughout a page
+    cannot drown out the parts that make it different.
+    """
+    shingles = _shingles(tokens)
+    digests = b''.join(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest() for s in shingles)
+    # All hashes as one bit string; position b of every hash is then the slice [b::64]
+    bits = format(int.from_bytes(digests, 'big'), f'0{len(digests) * 8}b')
+    threshold = len(shingles) / 2
+    value = 0
+    for position in range(SIMHASH_BITS):
+        value = (value << 1) | (bits[position::SIMHASH_BITS].count('1') > threshold)
+    return value
+
+
+def fingerprint(markdown: str) -> Tuple[str, Optional[int]]:
+    """(text hash, SimHash) of a page; the SimHash is None for very short pages"""
+    tokens = TOKEN_RE.findall(markdown.lower())
+    return text_hash(markdown), simhash(tokens) if len(tokens) >= MIN_TOKENS else None
+
+
+class DuplicateDetector:
+    """Remembers the content of every page kept in this run.
+
+    Three checks, cheapest first: identical response bodies (before any
+    parsing), identical extracted text, and SimHash near-duplicates of the
+    extracted text. Checks register the page when it is new, under a lock,
+    so concurrent workers never both keep the same content.
+
+    Templated pages (say, one per API endpoint) can have nearby SimHashes
+    without being copies, so a SimHash match is confirmed by comparing
+    shingles with the kept page's text, fetched through load_text(url).
+    Without load_text, or when the kept text is not available, a SimHash
+    match alone never makes a page a duplicate.
+    """
+
+    def __init__(self, max_distance: int = MAX_DISTANCE,
+                 load_text: Optional[Callable[[str], Optional[str]]] = None):
+        self.max_distance = max_distance
+        self.load_text = load_text
+        self.duplicates: Dict[str, str] = {}
+        self._bodies: Dict[str, str] = {}
+        self._texts: Dict[str, str] = {}
+        self._bands: List[Dict[int, List[Tuple[int, str]]]] = [{} for _ in range(BANDS)]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _band_keys(value: int) -> List[int]:
+        mask = (1 << BAND_BITS) - 1
+        return [(value >> (i * BAND_BITS)) & mask for i in range(BANDS)]
+
+    def _candidates(self, value: int) -> Iterator[str]:
+        for band, key in zip(self._bands, self._band_keys(value)):
+            for other, url in band.get(key, ()):
+                if bin(value ^ other).count('1') <= self.max_distance:
+                    yield url
+
+    def _near(self, value: int, markdown: Optional[str]) -> Optional[str]:
+        """Kept URL whose text is a confirmed near-duplicate of markdown"""
+        if markdown is None or self.load_text is None:
+            return None
+        checked = set()
+        for url in self._candidates(value):
+            if url in checked:
+                continue
+            checked.add(url)
+            kept = self.load_text(url)
+            if kept is not None and similarity(markdown, kept) >= MIN_SIMILARITY:
+                return url
+        return None
+
+    def _add_simhash(self, value: int, url: str):
+        for band, key in zip(self._bands, self._band_keys(value)):
+            band.setdefault(key, []).append((value, url))
+
+    def check_body(self, url: str, digest: str) -> Optional[str]:
+        """URL already kept with the exact same response body, else claim the body for url"""
+        with self._lock:
+            original = self._bodies.setdefault(digest, url)
+            if original == url:
+                return None
+            self.duplicates[url] = original
+            return original
+
+    def check_text(self, url: str, digest: str, text_digest: str,
+                   simhash_value: Optional[int], markdown: Optional[str] = None) -> Optional[str]:
+        """URL already kept with the same or nearly the same text, else register url"""
+        with self._lock:
+            original = self._texts.get(text_digest)
+            if original is None and simhash_value is not None:
+                original = self._near(simhash_value, markdown)
+            if original is not None and original != url:
+                self.duplicates[url] = original
+                if self._bodies.get(digest) == url:
+                    self._bodies[digest] = original
+                return original
+
+            self._texts[text_digest] = url
+            if simhash_value is not None:
+                self._add_simhash(simhash_value, url)
+            return None
+
+    def register(self, url: str, entry: dict) -> Optional[str]:
+        """Remember a page kept from an earlier run, from its manifest entry.
+
+        Returns the URL already kept with the same content, if any, in which
+        case the page is a duplicate and is not registered.
+        """
+        simhash_value = int(entry['simhash'], 16) if entry.get('simhash') else None
+        with self._lock:
+            original = self._texts.get(entry.get('text_hash'))
+            if original is None and simhash_value is not None and self.load_text is not None:
+                original = self._near(simhash_value, self.load_text(url))
+            if original is None and entry.get('content_hash'):
+                original = self._bodies.get(entry['content_hash'])
+            if original is not None and original != url:
+                self.duplicates[url] = original
+                return original
+
+            if entry.get('content_hash'):
+                self._bodies[entry['content_hash']] = url
+            if entry.get('text_hash'):
+                self._texts[entry['text_hash']] = url
+            if simhash_value is not None:
+                self._add_simhash(simhash_value, url)
+            return None
+
+    def release_body(self, url: str, digest: str):
+        """Give up a body claim for a page that ended up not being saved"""
+        with self._lock:
+            if self._bodies.get(digest) == url:
+                del self._bodies[digest]
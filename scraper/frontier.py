@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Crawl frontier for the Universal Documentation Scraper.
+Canonicalizes URLs, deduplicates them at enqueue time and hands them out by priority.
+"""
+
+from collections import deque
+from functools import lru_cache
+from posixpath import splitext
+from typing import Callable, Deque, Dict, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that never change page content
+TRACKING_PARAMS = {
+    'gclid', 'fbclid', 'msclkid', 'mc_cid', 'mc_eid', '_ga', '_gl', 'ref_src'
+}
+
+# Path suffixes that are never documentation pages
+BINARY_EXTENSIONS = {
+    '.pdf', '.zip', '.gz', '.tgz', '.tar', '.bz2', '.xz', '.7z', '.rar',
+    '.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp', '.ico', '.bmp',
+    '.mp3', '.mp4', '.webm', '.mov', '.avi', '.wav', '.ogg',
+    '.woff', '.woff2', '.ttf', '.eot', '.otf',
+    '.css', '.js', '.map', '.wasm', '.exe', '.dmg', '.pkg', '.deb', '.rpm',
+    '.whl', '.jar', '.iso', '.bin'
+}
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+@lru_cache(maxsize=65536)
+def canonicalize_url(url: str, ignore_query: bool = False) -> str:
+    """Normalize a URL so that trivially different spellings compare equal.
+
+    Lowercases scheme and host, drops default ports and fragments, removes
+    tracking parameters and sorts the remaining query (or drops it entirely
+    when ignore_query is set). Results are cached because navigation links
+    repeat on nearly every page of a docs site.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+
+    netloc = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{parts.port}"
+    if parts.username:
+        userinfo = parts.username + (f":{parts.password}" if parts.password else '')
+        netloc = f"{userinfo}@{netloc}"
+
+    path = parts.path or '/'
+
+    query = ''
+    if parts.query and not ignore_query:
+        params = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                  if key not in TRACKING_PARAMS and not key.startswith('utm_')]
+        query = urlencode(sorted(params))
+
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+
+def is_binary_url(url: str) -> bool:
+    """Check whether the URL path ends in a known non-HTML file extension"""
+    path = url.split('#', 1)[0].split('?', 1)[0]
+    return splitext(path.rsplit('/', 1)[-1])[1].lower() in BINARY_EXTENSIONS
+
+
+def path_depth(url: str, depth: int = 0) -> int:
+    """Default priority: number of path segments, so shallower pages come first"""
+    return len([segment for segment in urlsplit(url).path.split('/') if segment])
+
+
+class CrawlFrontier:
+    """Priority-ordered, deduplicating queue of URLs to crawl.
+
+    URLs are canonicalized and checked against the seen-set when they are
+    added, so each page is queued at most once. Pending URLs live in one FIFO
+    bucket per integer priority (lower first), which keeps add() and pop()
+    O(1) for the small priority ranges that path or link depth produce.
+    """
+
+    def __init__(self, max_depth: Optional[int] = None, ignore_query: bool = False,
+                 priority: Callable[[str, int], int] = path_depth):
+        self.max_depth = max_depth
+        self.ignore_query = ignore_query
+        self.priority = priority
+        self.seen: Set[str] = set()
+        self._buckets: Dict[int, Deque[Tuple[str, int]]] = {}
+        self._min_priority = 0
+        self._pending = 0
+
+    def __len__(self) -> int:
+        return self._pending
+
+    def __contains__(self, url: str) -> bool:
+        return canonicalize_url(url, self.ignore_query) in self.seen
+
+    def add(self, url: str, depth: int = 0) -> bool:
+        """Queue a URL found at the given link depth; returns False if it was skipped"""
+        if self.max_depth is not None and depth > self.max_depth:
+            return False
+
+        url = canonicalize_url(url, self.ignore_query)
+        if url in self.seen:
+            return False
+        self.seen.add(url)
+
+        priority = max(0, self.priority(url, depth))
+        bucket = self._buckets.get(priority)
+        if bucket is None:
+            bucket = self._buckets[priority] = deque()
+        bucket.append((url, depth))
+
+        if self._pending == 0 or priority < self._min_priority:
+            self._min_priority = priority
+        self._pending += 1
+        return True
+
+    def pop(self) -> Optional[Tuple[str, int]]:
+        """Return the next (url, depth) to crawl, or None if the frontier is empty"""
+        if not self._pending:
+            return None
+
+        while not self._buckets.get(self._min_priority):
+            self._min_priority += 1
+
+        self._pending -= 1
+        return self._buckets[self._min_priority].popleft()
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP response cache for the Universal Documentation Scraper.
+A content-addressed on-disk cache that any number of scraper instances can
+share, following Cache-Control and evicting least recently used bodies.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import timedelta
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Callable, Dict, Mapping, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# Headers that describe the transfer rather than the stored (already decoded) body
+TRANSFER_HEADERS = {'connection', 'keep-alive', 'transfer-encoding', 'content-encoding',
+                    'content-length', 'set-cookie', 'age'}
+# Without explicit freshness, reuse for 10% of the time since Last-Modified, up to a day
+HEURISTIC_FRACTION = 0.1
+MAX_HEURISTIC_LIFETIME = 24 * 3600
+# How long a request waits for an identical one in flight before sending its own
+COALESCE_TIMEOUT = 60.0
+
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    """Cache-Control directives as a lowercase name -> argument (or None) dict"""
+    directives = {}
+    for part in (value or '').split(','):
+        name, _, argument = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = argument.strip('"') or None
+    return directives
+
+
+def _http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def freshness_lifetime(headers: Mapping[str, str]) -> Optional[float]:
+    """Seconds a response may be reused without revalidation, or None if it must not be stored.
+
+    This is a shared cache, so `private` responses are not stored either.
+    """
+    directives = parse_cache_control(headers.get('Cache-Control'))
+    if 'no-store' in directives or 'private' in directives or headers.get('Vary', '').strip() == '*':
+        return None
+    if 'no-cache' in directives:
+        return 0.0
+    for name in ('s-maxage', 'max-age'):
+        if directives.get(name):
+            try:
+                return max(0.0, float(directives[name]) - float(headers.get('Age') or 0))
+            except ValueError:
+                return 0.0
+
+    date = _http_date(headers.get('Date')) or time.time()
+    if 'Expires' in headers:
+        expires = _http_date(headers['Expires'])
+        return max(0.0, expires - date) if expires else 0.0
+    last_modified = _http_date(headers.get('Last-Modified'))
+    if last_modified and last_modified < date:
+        return min(MAX_HEURISTIC_LIFETIME, HEURISTIC_FRACTION * (date - last_modified))
+    return 0.0
+
+
+def _matches_conditional(request_headers: Mapping[str, str], headers: Mapping[str, str]) -> bool:
+    """True if a conditional request would get 304 Not Modified for a response with these headers"""
+    if_none_match = request_headers.get('If-None-Match')
+    if if_none_match:
+        etag = headers.get('ETag')
+        return if_none_match.strip() == '*' or (
+            etag is not None and etag in (tag.strip() for tag in if_none_match.split(',')))
+    since = _http_date(request_headers.get('If-Modified-Since'))
+    last_modified = _http_date(headers.get('Last-Modified'))
+    return since is not None and last_modified is not None and last_modified <= since
+
+
+def _cached_response(url: str, status: int, headers: Mapping[str, str], body: bytes) -> requests.Response:
+    response = requests.Response()
+    response.url = url
+    response.status_code = status
+    response.reason = 'OK' if status == 200 else 'Not Modified'
+    response.headers = CaseInsensitiveDict(headers)
+    response.headers['X-Cache'] = 'HIT'
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.elapsed = timedelta(0)
+    response._content = body
+    return response
+
+
+class CacheStats:
+    """What the cache did for one scraper instance"""
+
+    def __init__(self):
+        self.requests = 0
+        self.hits = 0
+        self.revalidated = 0
+        self.coalesced = 0
+        self.stored = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+
+    def count(self, name: str, amount: int = 1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            served = self.hits + self.revalidated
+            return {
+                'requests': self.requests,
+                'hits': self.hits,
+                'revalidated': self.revalidated,
+                'misses': self.requests - served,
+                'coalesced': self.coalesced,
+                'stored': self.stored,
+                'hit_rate': round(served / self.requests, 3) if self.requests else 0.0,
+                'bytes_saved': self.bytes_saved
+            }
+
+
+class HttpCache:
+    """On-disk GET cache shared between scraper instances, threads and processes.
+
+    Bodies are stored once per sha256 digest under blobs/, so the same page
+    served under several URLs takes space once; an SQLite index maps URLs to
+    digests with their headers and expiry. Fresh entries are served without
+    touching the network, stale ones with a validator are revalidated with a
+    conditional request. When the stored bodies exceed `max_bytes` the least
+    recently used ones are evicted. Identical requests in flight at the same
+    time (e.g. two sessions scraping the same site) are sent once: the others
+    wait and are then served from the cache.
+    """
+
+    INDEX_FILENAME = 'index.sqlite'
+
+    def __init__(self, directory, max_bytes: int = 512 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.blob_dir = self.directory / 'blobs'
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, threading.Event] = {}
+
+        self._conn = sqlite3.connect(self.directory / self.INDEX_FILENAME,
+                                     check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS blobs '
+                           '(digest TEXT PRIMARY KEY, size INTEGER NOT NULL, last_used REAL NOT NULL)')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS entries (url TEXT PRIMARY KEY, '
+                           'digest TEXT NOT NULL, headers TEXT NOT NULL, expires_at REAL NOT NULL)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS blobs_last_used ON blobs (last_used)')
+        self._size = self._stored_size()
+
+    def _stored_size(self) -> int:
+        return self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM blobs').fetchone()[0]
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.blob_dir / digest[:2] / digest
+
+    def _lookup(self, url: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute('SELECT digest, headers, expires_at FROM entries WHERE url = ?',
+                                     (url,)).fetchone()
+        if row is None:
+            return None
+        try:
+            body = self._blob_path(row[0]).read_bytes()
+        except OSError:
+            return None
+        with self._lock:
+            self._conn.execute('UPDATE blobs SET last_used = ? WHERE digest = ?', (time.time(), row[0]))
+        return {'digest': row[0], 'headers': json.loads(row[1]), 'expires_at': row[2], 'body': body}
+
+    def _store(self, url: str, headers: Mapping[str, str], body: bytes, lifetime: float):
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._blob_path(digest)
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            partial = path.with_name(f'{digest}.{os.getpid()}.{threading.get_ident()}.part')
+            partial.write_bytes(body)
+            os.replace(partial, path)
+        stored_headers = {name: value for name, value in headers.items()
+                          if name.lower() not in TRANSFER_HEADERS}
+        with self._lock:
+            with self._conn:
+                self._conn.execute('BEGIN')
+                added = self._conn.execute('INSERT OR IGNORE INTO blobs (digest, size, last_used) '
+                                           'VALUES (?, ?, ?)', (digest, len(body), time.time())).rowcount
+                self._conn.execute('INSERT OR REPLACE INTO entries (url, digest, headers, expires_at) '
+                                   'VALUES (?, ?, ?, ?)',
+                                   (url, digest, json.dumps(stored_headers), time.time() + lifetime))
+            if added:
+                self._size += len(body)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _refresh(self, url: str, entry: dict, headers: Mapping[str, str]) -> dict:
+        """Apply the headers of a 304 to a stored entry and extend its freshness"""
+        merged = CaseInsensitiveDict(entry['headers'])
+        merged.update({name: value for name, value in headers.items()
+                       if name.lower() not in TRANSFER_HEADERS})
+        lifetime = freshness_lifetime(merged) or 0.0
+        entry = dict(entry, headers=dict(merged), expires_at=time.time() + lifetime)
+        with self._lock:
+            self._conn.execute('UPDATE entries SET headers = ?, expires_at = ? WHERE url = ?',
+                               (json.dumps(entry['headers']), entry['expires_at'], url))
+        return entry
+
+    def _evict(self):
+        """Drop least recently used bodies (and the entries using them) down to 90% of max_bytes"""
+        # Other processes may have added or evicted bodies since we last looked
+        self._size = self._stored_size()
+        target = 0.9 * self.max_bytes
+        evicted = []
+        for digest, size in self._conn.execute('SELECT digest, size FROM blobs ORDER BY last_used'):
+            if self._size <= target:
+                break
+            evicted.append(digest)
+            self._size -= size
+        if not evicted:
+            return
+        with self._conn:
+            self._conn.execute('BEGIN')
+            self._conn.executemany('DELETE FROM entries WHERE digest = ?', [(d,) for d in evicted])
+            self._conn.executemany('DELETE FROM blobs WHERE digest = ?', [(d,) for d in evicted])
+        for digest in evicted:
+            self._blob_path(digest).unlink(missing_ok=True)
+
+    def _serve(self, url: str, entry: dict, request_headers: Mapping[str, str]) -> requests.Response:
+        """Answer from a cached entry, with a 304 if the caller's own validators still match"""
+        if _matches_conditional(request_headers, entry['headers']):
+            return _cached_response(url, 304, entry['headers'], b'')
+        return _cached_response(url, 200, entry['headers'], entry['body'])
+
+    def get(self, url: str, headers: Optional[Mapping[str, str]],
+            send: Callable[[Dict[str, str]], requests.Response],
+            stats: Optional[CacheStats] = None) -> requests.Response:
+        """GET url through the cache; send(headers) performs the real request when needed.
+
+        The caller's If-None-Match / If-Modified-Since are answered from the
+        cache when possible. Responses from send() must already have their
+        body loaded.
+        """
+        stats = stats or CacheStats()
+        stats.count('requests')
+        request_headers = CaseInsensitiveDict(headers or {})
+        waited = False
+        while True:
+            entry = self._lookup(url)
+            if entry and entry['expires_at'] > time.time():
+                stats.count('hits')
+                stats.count('bytes_saved', len(entry['body']))
+                if waited:
+                    stats.count('coalesced')
+                return self._serve(url, entry, request_headers)
+            with self._lock:
+                leader = self._inflight.get(url)
+                if leader is None:
+                    done = self._inflight[url] = threading.Event()
+            if leader is None:
+                break
+            # Someone is already fetching this URL: wait and use what they stored
+            leader.wait(COALESCE_TIMEOUT)
+            waited = True
+
+        try:
+            send_headers = dict(request_headers)
+            if entry:
+                # Revalidate our copy; the caller's validators are checked against it afterwards
+                send_headers.pop('If-None-Match', None)
+                send_headers.pop('If-Modified-Since', None)
+                if entry['headers'].get('ETag'):
+                    send_headers['If-None-Match'] = entry['headers']['ETag']
+                if entry['headers'].get('Last-Modified'):
+                    send_headers['If-Modified-Since'] = entry['headers']['Last-Modified']
+            response = send(send_headers)
+
+            if entry and response.status_code == 304:
+                stats.count('revalidated')
+                stats.count('bytes_saved', len(entry['body']))
+                return self._serve(url, self._refresh(url, entry, response.headers), request_headers)
+
+            if response.status_code == 200:
+                lifetime = freshness_lifetime(response.headers)
+                has_validator = 'ETag' in response.headers or 'Last-Modified' in response.headers
+                if lifetime is not None and (lifetime > 0 or has_validator):
+                    self._store(url, response.headers, response.content, lifetime)
+                    stats.count('stored')
+            return response
+        finally:
+            with self._lock:
+                del self._inflight[url]
+            done.set()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Per-job logging for the web front ends of the Universal Documentation Scraper.
+Every scrape job gets a logger of its own, so concurrent jobs never see each
+other's records, and releases it when the job is over.
+"""
+
+import logging
+
+# Progress and log events kept per job
+MAX_EVENTS = 1000
+FINISHED_STATUSES = ("completed", "error", "cancelled")
+
+
+def job_logger(name: str) -> logging.Logger:
+    """A logger for one job, detached from the root logger's handlers"""
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger
+
+
+def release_logger(logger: logging.Logger):
+    """Detach a finished job's handlers and drop its logger from logging's registry"""
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    # Finished jobs' loggers would otherwise accumulate for the life of the process
+    logging.Logger.manager.loggerDict.pop(logger.name, None)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Link extraction for the Universal Documentation Scraper.
+Reads a page's <a href> and <base href> straight off lxml's HTML tokenizer,
+without building a document tree, for discovery crawling that needs nothing else.
+"""
+
+import codecs
+import re
+from typing import Iterable, List, Optional, Union
+from urllib.parse import urljoin
+
+from lxml import etree
+
+from scraper.frontier import canonicalize_url, is_binary_url
+
+CHARSET_RE = re.compile(r'charset\s*=\s*["\']?([^\s;"\']+)', re.IGNORECASE)
+
+
+def declared_charset(content_type: Optional[str]) -> Optional[str]:
+    """Codec name of the charset declared in a Content-Type header, if it is one Python knows"""
+    match = CHARSET_RE.search(content_type or '')
+    if not match:
+        return None
+    try:
+        return codecs.lookup(match.group(1)).name
+    except LookupError:
+        return None
+
+
+def decode_page(content: bytes, content_type: Optional[str] = None) -> Union[str, bytes]:
+    """Page text, decoded by the charset its response headers declare.
+
+    A UTF-8 byte order mark overrides the header. Without a usable header
+    charset the page is decoded as UTF-8 when it is valid UTF-8; otherwise
+    the bytes are returned for the parser to decode by its <meta charset>.
+    """
+    if content.startswith(codecs.BOM_UTF8):
+        return content.decode('utf-8-sig', errors='replace')
+    charset = declared_charset(content_type)
+    if charset:
+        return content.decode(charset, errors='replace')
+    try:
+        return content.decode('utf-8')
+    except UnicodeDecodeError:
+        return content
+
+
+def internal_links(hrefs: Iterable[str], page_url: str, base_href: Optional[str],
+                   base_prefix: str, ignore_query: bool = False) -> List[str]:
+    """Canonical internal, non-binary links for a page's href values, in page order.
+
+    Relative links resolve against the page's <base href> when it has one,
+    as a browser resolves them.
+    """
+    base_url = urljoin(page_url, base_href) if base_href is not None else page_url
+    links = []
+    for href in hrefs:
+        try:
+            full_url = canonicalize_url(urljoin(base_url, href), ignore_query)
+        except ValueError:
+            continue
+
+        # Only process internal links
+        if full_url.startswith(base_prefix) and not is_binary_url(full_url):
+            links.append(full_url)
+    return links
+
+
+class _LinkCollector:
+    """lxml parser target keeping the href of every <a> and of the first <base>"""
+
+    def __init__(self):
+        self.hrefs: List[str] = []
+        self.base_href: Optional[str] = None
+
+    def start(self, tag, attrib):
+        if tag == 'a':
+            href = attrib.get('href')
+            if href is not None:
+                self.hrefs.append(href)
+        elif tag == 'base' and self.base_href is None:
+            self.base_href = attrib.get('href')
+
+    def close(self):
+        return self
+
+
+def extract_page_links(content: bytes, page_url: str, base_prefix: str,
+                       ignore_query: bool = False, content_type: Optional[str] = None) -> List[str]:
+    """Return the canonical internal, non-binary links of a raw HTML page.
+
+    Finds the same links as converter.extract_links does on the parsed
+    page, several times faster: the tokenizer reports start tags to a
+    collector and no tree is ever built. Pass the response's Content-Type
+    so the page is decoded by its declared charset instead of guessed.
+    """
+    collector = _LinkCollector()
+    parser = etree.HTMLParser(target=collector)
+    try:
+        parser.feed(decode_page(content, content_type))
+        parser.close()
+    except etree.LxmlError:
+        # Empty or hopelessly broken markup: keep whatever was read before the error
+        pass
+    return internal_links(collector.hrefs, page_url, collector.base_href, base_prefix, ignore_query)
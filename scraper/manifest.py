@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Page manifest for incremental re-scrapes.
+Records what each URL looked like the last time it was saved into an output directory.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from scraper.store import FileStore
+
+
+def content_hash(content: bytes) -> str:
+    """Stable fingerprint of a response body"""
+    return hashlib.sha256(content).hexdigest()
+
+
+class PageManifest:
+    """Per-output-directory record of URL, validators, content hash and output file.
+
+    Entries from the previous run are used to send conditional requests and
+    to skip re-converting pages whose body did not change. Every URL seen in
+    the current run is classified as new, changed or unchanged; entries that
+    were not seen at all are reported as deleted when the run is finalized.
+    Pages found to duplicate another page lose their entry and output file.
+    Output files are looked up and removed through the page store.
+    """
+
+    FILENAME = 'page_manifest.json'
+
+    def __init__(self, output_dir: Path, store=None):
+        self.path = Path(output_dir) / self.FILENAME
+        self.store = store or FileStore(output_dir)
+        self.entries: Dict[str, dict] = {}
+        self.statuses: Dict[str, str] = {}
+        self._dropped_files: List[str] = []
+        self._saved_run: dict = {}
+        self._lock = threading.Lock()
+
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.entries = data.get('pages', {})
+                self._saved_run = data.get('run', {})
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def get(self, url: str) -> Optional[dict]:
+        """Previous entry for a URL, if its page is still in the store"""
+        entry = self.entries.get(url)
+        if entry and self.store.contains(entry.get('filename', '')):
+            return entry
+        return None
+
+    def files(self) -> Dict[str, str]:
+        """Output filename -> page title for every page currently kept"""
+        with self._lock:
+            return {entry['filename']: entry.get('title') or 'Untitled'
+                    for entry in self.entries.values() if entry.get('filename')}
+
+    def conditional_headers(self, url: str, need_links: bool = False) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since headers from the previous response.
+
+        A crawl needs each page's outlinks, so with need_links the request is
+        only made conditional when the previous entry recorded them.
+        """
+        entry = self.get(url)
+        headers = {}
+        if entry and (not need_links or 'links' in entry):
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def is_unchanged(self, url: str, digest: str, need_links: bool = False) -> bool:
+        """True if the body hashes the same as the last saved version"""
+        entry = self.get(url)
+        if not entry or (need_links and 'links' not in entry):
+            return False
+        return entry.get('content_hash') == digest
+
+    def is_fresh(self, url: str, lastmod: Optional[datetime]) -> bool:
+        """True if the saved copy was fetched after the page's sitemap <lastmod>"""
+        entry = self.get(url)
+        if not entry or lastmod is None:
+            return False
+        verified = entry.get('checked_at') or entry.get('scraped_at')
+        if not verified:
+            return False
+        return lastmod <= datetime.fromisoformat(verified).astimezone()
+
+    def mark_unchanged(self, url: str, etag: Optional[str] = None,
+                       last_modified: Optional[str] = None, verified: bool = True) -> dict:
+        """Record that a page was skipped because it has not changed.
+
+        Only a verified skip (a 304 or an identical body) moves checked_at:
+        a page skipped on its sitemap <lastmod> alone was not looked at, so
+        it must not look freshly checked to later runs.
+        """
+        with self._lock:
+            entry = self.entries[url]
+            if etag:
+                entry['etag'] = etag
+            if last_modified:
+                entry['last_modified'] = last_modified
+            if verified:
+                entry['checked_at'] = datetime.now().isoformat()
+            # Saved by the interrupted run being resumed, but not checkpointed as done:
+            # the page is still new (or changed) as far as this scrape is concerned
+            if self.statuses.get(url) not in ('new', 'changed'):
+                self.statuses[url] = 'unchanged'
+            return entry
+
+    def mark_failed(self, url: str):
+        """Keep the previous entry of a page that could not be fetched this time"""
+        with self._lock:
+            if url in self.entries:
+                self.statuses[url] = 'failed'
+
+    def mark_duplicate(self, url: str):
+        """Record that a page duplicates another one and is not kept on its own"""
+        with self._lock:
+            self.statuses[url] = 'duplicate'
+            entry = self.entries.pop(url, None)
+            if entry and entry.get('filename'):
+                # Removed at finalize, unless another kept page still writes to the same file
+                self._dropped_files.append(entry['filename'])
+
+    def record(self, url: str, filename: str, digest: str, title: str,
+               etag: Optional[str] = None, last_modified: Optional[str] = None,
+               links: Optional[List[str]] = None, text_hash: Optional[str] = None,
+               simhash: Optional[int] = None):
+        """Record a page that was converted and written in this run"""
+        with self._lock:
+            if self.statuses.get(url) != 'new':
+                self.statuses[url] = 'changed' if url in self.entries else 'new'
+            entry = {
+                'filename': filename,
+                'title': title,
+                'etag': etag,
+                'last_modified': last_modified,
+                'content_hash': digest,
+                'scraped_at': datetime.now().isoformat()
+            }
+            if text_hash:
+                entry['text_hash'] = text_hash
+            if simhash is not None:
+                entry['simhash'] = format(simhash, '016x')
+            if links is not None:
+                entry['links'] = links
+            self.entries[url] = entry
+
+    def finalize(self, complete: bool = True) -> Dict[str, int]:
+        """Drop entries for pages that disappeared and return per-status counts.
+
+        Only a run that saw the whole site (complete=True) can tell that a
+        page was deleted; partial runs keep unseen entries untouched.
+        """
+        deleted: List[str] = []
+        with self._lock:
+            stale_files = self._dropped_files
+            self._dropped_files = []
+            if complete:
+                deleted = [url for url in self.entries if url not in self.statuses]
+                stale_files += [self.entries.pop(url).get('filename', '') for url in deleted]
+
+            live_files = {entry['filename'] for entry in self.entries.values()}
+            for filename in stale_files:
+                if filename and filename not in live_files:
+                    self.store.remove(filename)
+
+            counts = {'new': 0, 'changed': 0, 'unchanged': 0, 'duplicate': 0,
+                      'deleted': len(deleted)}
+            for status in self.statuses.values():
+                if status in counts:
+                    counts[status] += 1
+        return counts
+
+    def resume_run(self) -> dict:
+        """Restore the per-page statuses of an interrupted run saved with save(run=...).
+
+        Returns the extra run state that was saved alongside them.
+        """
+        with self._lock:
+            run = self._saved_run
+            self.statuses.update(run.get('statuses', {}))
+            self._dropped_files.extend(run.get('dropped_files', []))
+            return run
+
+    def save(self, run: Optional[dict] = None):
+        """Atomically write the manifest next to the scraped pages.
+
+        Passing run marks the save as a checkpoint of an unfinished run: this
+        run's statuses are written too, together with the given extra state.
+        """
+        with self._lock:
+            data = {'updated_at': datetime.now().isoformat(), 'pages': self.entries}
+            if run is not None:
+                data['run'] = dict(run, statuses=self.statuses, dropped_files=self._dropped_files)
+            tmp_path = self.path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
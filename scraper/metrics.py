@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Stage timing metrics for the Universal Documentation Scraper.
+Cheap histograms and counters for where a scrape spends its time, with
+Prometheus text output and an optional cProfile of the hot path.
+"""
+
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence
+
+# Upper bounds (seconds) of the histogram buckets, from sub-millisecond parsing to slow fetches
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# What each stage measures, for the summary reader and Prometheus HELP lines
+STAGES = {
+    'page': 'one page from the start of its fetch until its result is ready',
+    'rate_limit_wait': 'waiting for the adaptive rate limiter before a request',
+    'fetch': 'HTTP request and body download',
+    'links': 'reading a crawled page\'s links off the HTML tokenizer',
+    'parse': 'HTML parsing',
+    'extract': 'locating the main content and removing clutter',
+    'convert': 'HTML to markdown conversion',
+    'fingerprint': 'duplicate-detection fingerprints',
+    'write': 'writing the page file',
+    'index': 'adding the page to the search index',
+    'chunk': 'splitting the page into chunks and streaming them out',
+    'robots': 'fetching robots.txt',
+    'sitemap_discovery': 'reading every sitemap, first request to last entry',
+    'crawl_discovery': 'discovering URLs by crawling without scraping',
+    'checkpoint': 'saving the manifest and crawl checkpoint',
+    'combine': 'writing COMBINED_DOCUMENTATION.md',
+}
+
+
+class Histogram:
+    """Fixed-bucket histogram of durations in seconds"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Approximate quantile: the upper bound of the bucket it falls in (max for the last bucket)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'total_seconds': round(self.sum, 4),
+            'mean_ms': round(self.sum / self.count * 1000, 3) if self.count else 0.0,
+            'p50_ms': round(self.quantile(0.5) * 1000, 3),
+            'p95_ms': round(self.quantile(0.95) * 1000, 3),
+            'p99_ms': round(self.quantile(0.99) * 1000, 3),
+            'max_ms': round(self.max * 1000, 3),
+            'buckets': {str(bound): count for bound, count in zip(self.buckets + ('+Inf',), self.counts)}
+        }
+
+
+class ScrapeMetrics:
+    """Per-stage duration histograms and event counters, safe to update from any thread.
+
+    With a parent, every observation is also recorded there, so one
+    long-lived instance can aggregate many scrapes (e.g. for /metrics).
+    """
+
+    def __init__(self, parent: Optional['ScrapeMetrics'] = None):
+        self.parent = parent
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(seconds)
+        if self.parent is not None:
+            self.parent.observe(stage, seconds)
+
+    def count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+        if self.parent is not None:
+            self.parent.count(name, amount)
+
+    @contextmanager
+    def time(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                'stages': {stage: {'description': STAGES.get(stage, ''), **histogram.to_dict()}
+                           for stage, histogram in sorted(self.histograms.items())},
+                'counters': dict(sorted(self.counters.items()))
+            }
+
+    def to_prometheus(self, prefix: str = 'docs_scraper') -> str:
+        """The metrics in the Prometheus text exposition format"""
+        lines = [f'# HELP {prefix}_stage_seconds Time spent per scraper stage.',
+                 f'# TYPE {prefix}_stage_seconds histogram']
+        with self._lock:
+            for stage, histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+                    cumulative += count
+                    lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {histogram.sum}')
+                lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+            for name, value in sorted(self.counters.items()):
+                lines.append(f'# TYPE {prefix}_{name}_total counter')
+                lines.append(f'{prefix}_{name}_total {value}')
+        return '\n'.join(lines) + '\n'
+
+
+class Profiler:
+    """cProfile over every thread that runs the scrape.
+
+    Before Python 3.12 a profiler only sees the thread that enabled it, so
+    each worker thread gets its own inside thread(); they are merged when
+    dumped. From 3.12 the one profiler started in start() sees all threads.
+    Conversion worker processes are not profiled.
+    """
+
+    def __init__(self):
+        self._per_thread = sys.version_info < (3, 12)
+        self._profiles: List[cProfile.Profile] = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _new_profile(self) -> cProfile.Profile:
+        profile = cProfile.Profile()
+        with self._lock:
+            self._profiles.append(profile)
+        return profile
+
+    def start(self):
+        self._main = self._new_profile()
+        self._main.enable()
+
+    def stop(self):
+        self._main.disable()
+
+    @contextmanager
+    def thread(self):
+        """Profile the enclosed code on a worker thread"""
+        if not self._per_thread or getattr(self._local, 'active', False):
+            yield
+            return
+        profile = getattr(self._local, 'profile', None) or self._new_profile()
+        self._local.profile = profile
+        self._local.active = True
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self._local.active = False
+
+    def dump(self, path: str, top: int = 25) -> str:
+        """Write the merged profile to path (for pstats/snakeviz) and return a top-functions report"""
+        with self._lock:
+            profiles = list(self._profiles)
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        stats.dump_stats(path)
+        report = io.StringIO()
+        stats.stream = report
+        stats.sort_stats('cumulative').print_stats(top)
+        return report.getvalue()
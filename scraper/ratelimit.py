@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Adaptive per-host rate limiting for the Universal Documentation Scraper.
+Token buckets whose rate follows server feedback: additive increase while
+responses are fast and healthy, multiplicative decrease on throttling or errors.
+"""
+
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+# Status codes that mean "slow down"
+THROTTLE_STATUSES = {429, 503}
+# Status codes that suggest the server is struggling
+OVERLOAD_STATUSES = {500, 502, 504}
+
+# Never go slower than one request per minute, or wait longer than this for Retry-After
+MIN_RATE = 1 / 60
+MAX_RETRY_AFTER = 300.0
+# Rate used when a host without a ceiling first asks us to back off and we have no estimate yet
+DEFAULT_BACKOFF_RATE = 1.0
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def parse_crawl_delay(robots_txt: str, user_agent: str = '*') -> Optional[float]:
+    """Crawl-delay for user_agent from robots.txt, falling back to the '*' group"""
+    delays: Dict[str, float] = {}
+    agents = []
+    in_rules = False
+    for line in robots_txt.splitlines():
+        line = line.split('#', 1)[0].strip()
+        if ':' not in line:
+            continue
+        field, value = (part.strip() for part in line.split(':', 1))
+        field = field.lower()
+        if field == 'user-agent':
+            if in_rules:
+                agents, in_rules = [], False
+            agents.append(value.lower())
+        else:
+            in_rules = True
+            if field == 'crawl-delay':
+                try:
+                    delay = float(value)
+                except ValueError:
+                    continue
+                for agent in agents:
+                    delays.setdefault(agent, delay)
+
+    user_agent = user_agent.lower()
+    for agent, delay in delays.items():
+        if agent != '*' and agent in user_agent:
+            return delay
+    return delays.get('*')
+
+
+class HostBucket:
+    """Token bucket for one host with an AIMD-controlled refill rate.
+
+    `ceiling` (requests/second, None for unlimited) is the fastest the rate
+    may go. A host without a ceiling is not throttled at all until it first
+    pushes back. Tokens are reserved on acquire, so concurrent callers are
+    spaced out rather than released together.
+    """
+
+    def __init__(self, ceiling: Optional[float], burst: int = 1,
+                 latency_target: float = 1.0, increase: float = 1.0):
+        self.ceiling = ceiling
+        self.burst = max(1, burst)
+        self.latency_target = latency_target
+        self.increase = increase
+        # Start at half speed and earn the rest
+        self.rate: Optional[float] = ceiling / 2 if ceiling else None
+        self.requests = 0
+        self.throttled = 0
+        self.errors = 0
+        self.crawl_delay: Optional[float] = None
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._first_request: Optional[float] = None
+        self._last_request: Optional[float] = None
+        self._latency: Optional[float] = None
+        self._best_latency: Optional[float] = None
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def limit(self, ceiling: float):
+        """Lower the ceiling and disallow bursts, e.g. to honor a robots.txt Crawl-delay"""
+        with self._lock:
+            self.burst = 1
+            self._tokens = min(self._tokens, 1.0)
+            self.ceiling = min(self.ceiling, ceiling) if self.ceiling else ceiling
+            self.rate = min(self.rate, self.ceiling) if self.rate else self.ceiling / 2
+
+    def acquire(self, cancel: Optional[threading.Event] = None):
+        """Block until this host may be sent another request, or until cancel is set"""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self._paused_until - now)
+            if self.rate:
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                self._tokens -= 1
+                if self._tokens < 0:
+                    wait = max(wait, -self._tokens / self.rate)
+            start = now + wait
+            self.requests += 1
+            self._first_request = self._first_request or start
+            self._last_request = max(self._last_request or start, start)
+        if wait > 0:
+            if cancel is not None:
+                cancel.wait(wait)
+            else:
+                time.sleep(wait)
+
+    def _backoff(self, factor: float, now: float):
+        # One decrease per round trip: a burst of bad responses to requests
+        # that were already in flight is a single congestion signal
+        if now - self._last_decrease < max(self._latency or 0.0, 1 / self.rate if self.rate else 0.0):
+            return
+        self._last_decrease = now
+        # Without a rate yet, start from what this host has actually been serving
+        observed = self.effective_rate() or DEFAULT_BACKOFF_RATE
+        self.rate = max(MIN_RATE, (self.rate or observed) * factor)
+        self._tokens = min(self._tokens, 0.0)
+
+    def feedback(self, status: Optional[int], latency: float, retry_after: Optional[float] = None):
+        """Adjust the rate after a response (status None means the request failed outright).
+
+        Latency is judged against this host's own best: a server that is
+        simply slow is not mistaken for one that is getting overloaded.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if status in THROTTLE_STATUSES:
+                self.throttled += 1
+                self._backoff(0.5, now)
+                pause = retry_after if retry_after is not None else 1 / self.rate
+                self._paused_until = max(self._paused_until, now + min(pause, MAX_RETRY_AFTER))
+                return
+            if status is None or status in OVERLOAD_STATUSES:
+                self.errors += 1
+                self._backoff(0.5, now)
+                return
+
+            self._latency = latency if self._latency is None else 0.8 * self._latency + 0.2 * latency
+            self._best_latency = min(self._best_latency or self._latency, self._latency)
+            if self.rate is None:
+                return
+            if self._latency > max(2 * self.latency_target, 3 * self._best_latency):
+                self._backoff(0.8, now)
+            elif latency <= max(self.latency_target, 1.5 * self._best_latency):
+                # Additive increase: about `increase` requests/second more per second of healthy traffic
+                self.rate += self.increase / max(self.rate, 1.0)
+                if self.ceiling and self.rate >= self.ceiling:
+                    self.rate = self.ceiling
+
+    def effective_rate(self) -> Optional[float]:
+        """Requests per second actually sent to this host so far"""
+        if not self._first_request or self.requests < 2 or self._last_request <= self._first_request:
+            return None
+        return (self.requests - 1) / (self._last_request - self._first_request)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            effective = self.effective_rate()
+            return {
+                'requests': self.requests,
+                'effective_rps': round(effective, 3) if effective else None,
+                'current_rps_limit': round(self.rate, 3) if self.rate else None,
+                'ceiling_rps': round(self.ceiling, 3) if self.ceiling else None,
+                'crawl_delay': self.crawl_delay,
+                'throttled_responses': self.throttled,
+                'error_responses': self.errors,
+                'avg_latency': round(self._latency, 3) if self._latency is not None else None
+            }
+
+
+class AdaptiveRateLimiter:
+    """One HostBucket per host, all sharing the same ceiling.
+
+    `min_delay` is the configured delay between requests in one fetch slot;
+    with `slots` parallel requests per host the ceiling is slots / min_delay
+    requests per second, which is what the old sleep-after-each-request
+    loop allowed at best. A min_delay of 0 means no ceiling.
+    """
+
+    def __init__(self, min_delay: float, slots: int = 1, latency_target: float = 1.0):
+        self.min_delay = min_delay
+        self.slots = max(1, slots)
+        self.latency_target = latency_target
+        self._hosts: Dict[str, HostBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, url: str) -> HostBucket:
+        host = urlparse(url).netloc
+        with self._lock:
+            bucket = self._hosts.get(host)
+            if bucket is None:
+                ceiling = self.slots / self.min_delay if self.min_delay > 0 else None
+                bucket = self._hosts[host] = HostBucket(ceiling, burst=self.slots,
+                                                        latency_target=self.latency_target)
+            return bucket
+
+    def set_crawl_delay(self, url: str, delay: float):
+        """Apply a robots.txt Crawl-delay (seconds between requests) to the URL's host"""
+        if delay > 0:
+            bucket = self.bucket(url)
+            bucket.crawl_delay = delay
+            bucket.limit(1 / delay)
+
+    def acquire(self, url: str, cancel: Optional[threading.Event] = None):
+        self.bucket(url).acquire(cancel)
+
+    def feedback(self, url: str, status: Optional[int], latency: float,
+                 retry_after: Optional[str] = None):
+        self.bucket(url).feedback(status, latency, parse_retry_after(retry_after))
+
+    def to_dict(self) -> Dict[str, dict]:
+        with self._lock:
+            hosts = dict(self._hosts)
+        return {host: bucket.to_dict() for host, bucket in hosts.items()}
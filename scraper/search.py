@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Full-text search over scraped documentation.
+Splits each saved page into sections at its markdown headings and indexes them
+in SQLite FTS5, so queries return ranked, highlighted sections in milliseconds.
+
+Usage: python scraper/search.py OUTPUT_DIR "query terms" [--limit 10]
+"""
+
+import argparse
+import html
+import re
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+HEADING_RE = re.compile(r'^(#{1,6})\s+(.+?)\s*#*\s*$')
+FENCE_RE = re.compile(r'^\s*(```|~~~)')
+FRONTMATTER_RE = re.compile(r'\A---\n.*?\n---\n', re.DOTALL)
+TOKEN_RE = re.compile(r'\w+\*?')
+
+# bm25 weights of the indexed columns: page title, heading path, section text
+RANK_WEIGHTS = (10.0, 5.0, 1.0)
+# Snippet markers; chosen so they never occur in text and survive HTML escaping
+MARK_START, MARK_END = '\x02', '\x03'
+
+
+def split_sections(document: str) -> Iterator[Tuple[Tuple[str, ...], str]]:
+    """Yield (heading path, text) for each heading-delimited section of a markdown page.
+
+    The heading path is the tuple of enclosing headings, outermost first. Lines inside
+    fenced code blocks are never taken for headings. Frontmatter and
+    headings with no text of their own are skipped.
+    """
+    document = FRONTMATTER_RE.sub('', document, count=1)
+    stack: List[Tuple[int, str]] = []
+    lines: List[str] = []
+    in_fence = False
+
+    def section():
+        text = '\n'.join(lines).strip()
+        return tuple(heading for _, heading in stack), text
+
+    for line in document.split('\n'):
+        if FENCE_RE.match(line):
+            in_fence = not in_fence
+        match = None if in_fence else HEADING_RE.match(line)
+        if not match:
+            lines.append(line)
+            continue
+        path, text = section()
+        if text:
+            yield path, text
+        level = len(match.group(1))
+        while stack and stack[-1][0] >= level:
+            stack.pop()
+        stack.append((level, match.group(2)))
+        lines = []
+
+    path, text = section()
+    if text:
+        yield path, text
+
+
+def query_terms(query: str) -> List[str]:
+    """The lowercased words of a free-text query; a trailing * (prefix match) is kept"""
+    return [token.lower() for token in TOKEN_RE.findall(query) if token.rstrip('*')]
+
+
+def match_query(query: str) -> Optional[str]:
+    """FTS5 query matching sections that contain every word of a free-text query.
+
+    Words are quoted, so punctuation and FTS5 operators in user input are
+    taken literally; a trailing * keeps prefix matching.
+    """
+    terms = [f'"{term[:-1]}"*' if term.endswith('*') else f'"{term}"' for term in query_terms(query)]
+    return ' '.join(terms) or None
+
+
+class SearchIndex:
+    """Section-level FTS5 index of the pages in an output directory.
+
+    Sections live in a plain table (indexed by filename, so a re-saved page
+    replaces its old sections cheaply) with an external-content FTS5 table
+    kept in step by triggers. Pages are added from any thread as they are
+    saved; writes are committed every `commit_every` pages and on flush().
+    """
+
+    FILENAME = 'search_index.sqlite'
+
+    def __init__(self, output_dir: Path, commit_every: int = 200):
+        self.path = Path(output_dir) / self.FILENAME
+        self.commit_every = commit_every
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sections (
+                id INTEGER PRIMARY KEY, filename TEXT NOT NULL, url TEXT,
+                title TEXT, heading TEXT, body TEXT);
+            CREATE INDEX IF NOT EXISTS sections_filename ON sections (filename);
+            CREATE VIRTUAL TABLE IF NOT EXISTS sections_fts USING fts5 (
+                title, heading, body, content='sections', content_rowid='id',
+                tokenize='porter unicode61');
+            CREATE TRIGGER IF NOT EXISTS sections_insert AFTER INSERT ON sections BEGIN
+                INSERT INTO sections_fts (rowid, title, heading, body)
+                VALUES (new.id, new.title, new.heading, new.body);
+            END;
+            CREATE VIRTUAL TABLE IF NOT EXISTS sections_vocab USING fts5vocab (sections_fts, row);
+            CREATE TABLE IF NOT EXISTS common_terms (term TEXT PRIMARY KEY);
+            CREATE TRIGGER IF NOT EXISTS sections_delete AFTER DELETE ON sections BEGIN
+                INSERT INTO sections_fts (sections_fts, rowid, title, heading, body)
+                VALUES ('delete', old.id, old.title, old.heading, old.body);
+            END;
+        """)
+        self._conn.commit()
+
+    def add_page(self, filename: str, url: str, title: str, document: str):
+        """Index (or re-index) a saved page from its markdown document"""
+        rows = [(filename, url, title, ' > '.join(path), body) for path, body in split_sections(document)]
+        with self._lock:
+            self._conn.execute('DELETE FROM sections WHERE filename = ?', (filename,))
+            self._conn.executemany(
+                'INSERT INTO sections (filename, url, title, heading, body) VALUES (?, ?, ?, ?, ?)', rows)
+            self._pending += 1
+            if self._pending >= self.commit_every:
+                self._conn.commit()
+                self._pending = 0
+
+    def sync(self, pages: Dict[str, Tuple[str, str]], read: Callable[[str], Optional[bytes]]):
+        """Make the index cover exactly the given pages (filename -> (url, title)).
+
+        Sections of pages no longer kept are dropped; pages kept from runs
+        that did not index them are read back through read(filename).
+        """
+        with self._lock:
+            indexed = {row[0] for row in self._conn.execute('SELECT DISTINCT filename FROM sections')}
+            self._conn.executemany('DELETE FROM sections WHERE filename = ?',
+                                   [(filename,) for filename in indexed - set(pages)])
+        for filename in sorted(set(pages) - indexed):
+            document = read(filename)
+            if document is not None:
+                url, title = pages[filename]
+                self.add_page(filename, url, title, document.decode('utf-8', errors='replace'))
+
+    def flush(self):
+        with self._lock:
+            self._conn.commit()
+            self._pending = 0
+
+    def optimize(self):
+        """Merge the FTS5 index segments and note the common terms, once indexing is done.
+
+        bm25 gives a term in more than half of all sections no weight at
+        all, so search() skips ranking queries made only of such terms.
+        """
+        with self._lock:
+            self._conn.execute("INSERT INTO sections_fts (sections_fts) VALUES ('optimize')")
+            self._conn.execute('DELETE FROM common_terms')
+            self._conn.execute('INSERT INTO common_terms SELECT term FROM sections_vocab '
+                               'WHERE doc * 2 > (SELECT count(*) FROM sections)')
+            self._conn.commit()
+            self._pending = 0
+
+    def close(self):
+        with self._lock:
+            try:
+                self._conn.commit()
+            except sqlite3.ProgrammingError:
+                # Already closed
+                return
+            self._conn.close()
+
+
+def search(output_dir: Path, query: str, limit: int = 10, offset: int = 0) -> List[dict]:
+    """Best matching sections for a free-text query, best first.
+
+    Each result has the page's url, filename and title, the section's
+    heading path, its bm25 relevance score (higher is better) and an HTML-escaped
+    snippet with matches wrapped in <mark>. Reads the index without
+    locking out a scrape that is still writing to it. Raises
+    FileNotFoundError if output_dir has no index.
+
+    Ranking costs time per matching section, so a query made only of
+    common terms (which bm25 cannot rank anyway) returns its matches in
+    index order with a score of 0.
+    """
+    path = Path(output_dir) / SearchIndex.FILENAME
+    if not path.is_file():
+        raise FileNotFoundError(path)
+    expression = match_query(query)
+    if expression is None:
+        return []
+
+    conn = sqlite3.connect(f'{path.resolve().as_uri()}?mode=ro', uri=True)
+    try:
+        terms = query_terms(query)
+        common = not any(term.endswith('*') for term in terms) and conn.execute(
+            f"SELECT count(*) FROM common_terms WHERE term IN ({', '.join('?' * len(terms))})",
+            terms).fetchone()[0] == len(set(terms))
+        score = '0.0' if common else f"bm25(sections_fts, {', '.join(map(str, RANK_WEIGHTS))})"
+        # Rank first and build snippets only for the page of results kept
+        ranked = conn.execute(
+            f"""SELECT rowid, {score} AS score FROM sections_fts WHERE sections_fts MATCH ?
+                ORDER BY {'rowid' if common else 'score'} LIMIT ? OFFSET ?""",
+            (expression, limit, offset)).fetchall()
+        details = {}
+        for rowid, _ in ranked:
+            details[rowid] = conn.execute(
+                """SELECT s.url, s.filename, s.title, s.heading, snippet(sections_fts, 2, ?, ?, '…', 24)
+                   FROM sections_fts JOIN sections s ON s.id = sections_fts.rowid
+                   WHERE sections_fts MATCH ? AND sections_fts.rowid = ?""",
+                (MARK_START, MARK_END, expression, rowid)).fetchone()
+        rows = [details[rowid] + (score,) for rowid, score in ranked if details[rowid]]
+    finally:
+        conn.close()
+
+    return [{
+        'url': url,
+        'filename': filename,
+        'title': title,
+        'heading': heading,
+        'snippet': html.escape(snippet).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>'),
+        'score': round(-score, 4) + 0.0
+    } for url, filename, title, heading, snippet, score in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Search a scrape output directory')
+    parser.add_argument('output_dir', help='Scrape output directory holding search_index.sqlite')
+    parser.add_argument('query', help='Words to search for (all must match; end a word with * for a prefix)')
+    parser.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args()
+
+    try:
+        results = search(Path(args.output_dir), args.query, args.limit)
+    except FileNotFoundError:
+        sys.exit(f"No search index in {args.output_dir} (scrape with --search-index)")
+    for result in results:
+        snippet = result['snippet'].replace('<mark>', '[').replace('</mark>', ']')
+        print(f"{result['score']:>9.3f}  {result['heading'] or result['title']}\n"
+              f"           {result['url']}\n           {html.unescape(snippet)}\n")
+
+
+if __name__ == '__main__':
+    main()
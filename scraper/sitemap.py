@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Streaming sitemap ingestion for the Universal Documentation Scraper.
+Fetches sitemap documents concurrently and yields page entries while they are still being parsed.
+"""
+
+import gzip
+import heapq
+import io
+import logging
+import queue
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable, IO, Iterable, Iterator, NamedTuple, Optional
+
+import requests
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+class SitemapEntry(NamedTuple):
+    """One <url> record from a sitemap"""
+    loc: str
+    lastmod: Optional[str] = None
+    changefreq: Optional[str] = None
+    priority: Optional[float] = None
+
+
+# Sitemap protocol default when <priority> is absent
+DEFAULT_PRIORITY = 0.5
+# Entries the scheduler reorders at a time; reading the sitemaps pauses while this many are waiting
+SCHEDULER_WINDOW = 5000
+
+
+def parse_lastmod(value: Optional[str]) -> Optional[datetime]:
+    """Parse a W3C datetime <lastmod> into an aware UTC datetime.
+
+    A date without a time means "some time that day", so it is read as the
+    end of the day to never claim a page is older than it might be.
+    """
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if 'T' not in value:
+        parsed += timedelta(days=1)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def _local_name(tag: str) -> str:
+    """Strip the XML namespace from an element tag"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def open_sitemap_stream(response: requests.Response) -> IO[bytes]:
+    """Readable byte stream of a sitemap body, transparently un-gzipped.
+
+    Content-Encoding is undone by urllib3; .xml.gz files served as plain
+    binaries are detected by their magic bytes.
+    """
+    response.raw.decode_content = True
+    # Let the buffered/gzip readers see EOF instead of a closed file
+    response.raw.auto_close = False
+    stream = io.BufferedReader(response.raw, buffer_size=64 * 1024)
+    if stream.peek(2)[:2] == GZIP_MAGIC:
+        return gzip.GzipFile(fileobj=stream)
+    return stream
+
+
+def iter_sitemap_document(stream: IO[bytes]) -> Iterator[tuple]:
+    """Incrementally parse one sitemap document.
+
+    Yields ('url', SitemapEntry) for pages and ('sitemap', loc) for children
+    of a sitemap index. Finished elements are discarded as parsing proceeds,
+    so memory stays flat even for 50k-URL documents.
+    """
+    root = None
+    fields = {}
+    for event, elem in ET.iterparse(stream, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = elem
+            continue
+
+        name = _local_name(elem.tag)
+        if name in ('loc', 'lastmod', 'changefreq', 'priority'):
+            fields[name] = (elem.text or '').strip()
+        elif name == 'url':
+            if fields.get('loc'):
+                try:
+                    priority = float(fields['priority']) if fields.get('priority') else None
+                except ValueError:
+                    priority = None
+                yield 'url', SitemapEntry(fields['loc'], fields.get('lastmod') or None,
+                                          fields.get('changefreq') or None, priority)
+            fields = {}
+            root.clear()
+        elif name == 'sitemap':
+            if fields.get('loc'):
+                yield 'sitemap', fields['loc']
+            fields = {}
+            root.clear()
+
+
+class SitemapReader:
+    """Fetch sitemap documents on a small thread pool and stream their entries.
+
+    Every document (including children discovered in sitemap indexes) is
+    fetched as soon as it is known, and page entries are handed to the
+    consumer through a bounded queue, so scraping can begin before the last
+    child sitemap has even been requested.
+    """
+
+    _DONE = object()
+
+    def __init__(self, fetch: Callable[..., requests.Response], workers: int = 4,
+                 logger: Optional[logging.Logger] = None, queue_size: int = 10000):
+        self.fetch = fetch
+        self.workers = max(1, workers)
+        self.logger = logger or logging.getLogger(__name__)
+        self.queue_size = queue_size
+
+    def iter_entries(self, sitemap_urls: Iterable[str] = (),
+                     robots_url: Optional[str] = None,
+                     robots_txt: Optional[str] = None) -> Iterator[SitemapEntry]:
+        """Yield unique page entries from the given sitemaps and robots.txt Sitemap: lines.
+
+        robots.txt is fetched from robots_url, unless its text is passed as robots_txt.
+        """
+        entries: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        lock = threading.Lock()
+        visited = set()
+        outstanding = [0]
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='sitemap')
+
+        def put(item) -> bool:
+            # Block while the consumer is behind, but give up once it has stopped
+            while not stop.is_set():
+                try:
+                    entries.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def submit(task, url: str):
+            with lock:
+                if url in visited:
+                    return
+                visited.add(url)
+                outstanding[0] += 1
+            pool.submit(run_task, task, url)
+
+        def run_task(task, url: str):
+            try:
+                task(url)
+            except Exception as e:
+                self.logger.debug(f"Could not parse sitemap {url}: {e}")
+            finally:
+                with lock:
+                    outstanding[0] -= 1
+                    finished = outstanding[0] == 0
+                if finished:
+                    put(self._DONE)
+
+        def read_robots_txt(text: str):
+            for line in text.splitlines():
+                if line.lower().startswith('sitemap:'):
+                    submit(read_sitemap, line.split(':', 1)[1].strip())
+
+        def read_robots(url: str):
+            response = self.fetch(url, timeout=10)
+            if response.status_code == 200:
+                read_robots_txt(response.text)
+
+        def read_sitemap(url: str):
+            response = self.fetch(url, timeout=10, stream=True)
+            try:
+                if response.status_code != 200:
+                    return
+                for kind, item in iter_sitemap_document(open_sitemap_stream(response)):
+                    if stop.is_set():
+                        return
+                    if kind == 'sitemap':
+                        submit(read_sitemap, item)
+                    elif not put(item):
+                        return
+            finally:
+                response.close()
+
+        if robots_txt is not None:
+            read_robots_txt(robots_txt)
+        elif robots_url:
+            submit(read_robots, robots_url)
+        for url in sitemap_urls:
+            submit(read_sitemap, url)
+
+        seen_locs = set()
+        try:
+            if not visited:
+                return
+            while True:
+                item = entries.get()
+                if item is self._DONE:
+                    # Late submissions may have raced the sentinel; only stop when idle
+                    with lock:
+                        if outstanding[0] == 0:
+                            break
+                    continue
+                if item.loc not in seen_locs:
+                    seen_locs.add(item.loc)
+                    yield item
+        finally:
+            stop.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+class SitemapScheduler:
+    """Reorder a stream of sitemap entries so the most important pages go first.
+
+    Entries are drained from the stream on a background thread into a heap
+    keyed by <priority> (highest first) and then <lastmod> (newest first).
+    Each next() hands out the best entry that has arrived so far, so ordering
+    improves as the sitemaps load without holding back the first request.
+    The heap holds at most `window` entries: once it is full the background
+    thread stops reading until entries are taken, so memory stays flat
+    however large the sitemaps are and ordering is exact within the window.
+    """
+
+    def __init__(self, entries: Iterator[SitemapEntry], window: int = SCHEDULER_WINDOW):
+        self._entries = entries
+        self.window = window
+        self._heap = []
+        self._seq = 0
+        self._done = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._fill, name='sitemap-scheduler', daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def sort_key(entry: SitemapEntry) -> tuple:
+        priority = entry.priority if entry.priority is not None else DEFAULT_PRIORITY
+        lastmod = parse_lastmod(entry.lastmod)
+        return (-priority, -lastmod.timestamp() if lastmod else 0.0)
+
+    def _fill(self):
+        try:
+            for entry in self._entries:
+                with self._cond:
+                    while len(self._heap) >= self.window and not self._closed:
+                        self._cond.wait()
+                    if self._closed:
+                        break
+                    heapq.heappush(self._heap, (self.sort_key(entry), self._seq, entry))
+                    self._seq += 1
+                    self._cond.notify()
+        finally:
+            close = getattr(self._entries, 'close', None)
+            if close:
+                close()
+            with self._cond:
+                self._done = True
+                self._cond.notify_all()
+
+    def __iter__(self) -> 'SitemapScheduler':
+        return self
+
+    def __next__(self) -> SitemapEntry:
+        with self._cond:
+            while not self._heap and not self._done:
+                self._cond.wait()
+            if not self._heap:
+                raise StopIteration
+            entry = heapq.heappop(self._heap)[2]
+            # Let the reader refill the window
+            self._cond.notify_all()
+            return entry
+
+    def close(self):
+        """Stop reading the underlying stream"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Page stores for the Universal Documentation Scraper.
+Where saved pages live: one markdown file per page, or a single JSONL or SQLite
+bundle with one record per page, plus an exporter from a bundle back to files.
+
+Usage: python scraper/store.py OUTPUT_DIR [--to DIRECTORY]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+# Fields of a page record besides its markdown, in frontmatter order
+METADATA_FIELDS = ('title', 'source_url', 'scraped_at', 'scraper_version')
+
+
+def page_document(record: dict) -> str:
+    """The markdown file for a page record: JSON frontmatter, title heading and content"""
+    metadata = {field: record.get(field) for field in METADATA_FIELDS}
+    return f"""---
+{json.dumps(metadata, indent=2)}
+---
+
+# {record.get('title')}
+
+{record['markdown']}
+"""
+
+
+def page_markdown(document: str) -> str:
+    """The markdown content of a document written by page_document, without frontmatter and title"""
+    _, separator, body = document.partition('\n---\n\n')
+    if not separator:
+        return document
+    heading, _, markdown = body.partition('\n\n')
+    return markdown.rstrip('\n') if heading.startswith('# ') else body.rstrip('\n')
+
+
+class FileStore:
+    """One markdown file per page in the output directory (the default layout)"""
+
+    FORMAT = 'files'
+
+    def __init__(self, output_dir: Path):
+        self.output_dir = Path(output_dir)
+
+    def write(self, filename: str, record: dict) -> str:
+        """Store a page record under filename; returns the page's markdown document"""
+        document = page_document(record)
+        path = self.output_dir / filename
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(document)
+        return document
+
+    def contains(self, filename: str) -> bool:
+        return bool(filename) and (self.output_dir / filename).is_file()
+
+    def read(self, filename: str) -> Optional[bytes]:
+        """The stored markdown document, or None"""
+        try:
+            return (self.output_dir / filename).read_bytes()
+        except OSError:
+            return None
+
+    def remove(self, filename: str):
+        (self.output_dir / filename).unlink(missing_ok=True)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class JsonlStore:
+    """Append-only pages.jsonl with one JSON record per saved page.
+
+    Records go through one buffered writer. A later record for the same
+    filename supersedes the earlier one and removals append a tombstone, so
+    the file is never rewritten while scraping; an index of the latest
+    record per filename is rebuilt on open. close() compacts the file once
+    more than half of it is superseded records.
+    """
+
+    FORMAT = 'jsonl'
+    FILENAME = 'pages.jsonl'
+
+    def __init__(self, output_dir: Path, buffer_size: int = 1024 * 1024):
+        self.path = Path(output_dir) / self.FILENAME
+        self.buffer_size = buffer_size
+        self._index: Dict[str, Tuple[int, int]] = {}
+        self._dead_bytes = 0
+        self._lock = threading.Lock()
+        self._load_index()
+        self._writer = open(self.path, 'ab', buffering=buffer_size)
+        self._reader = None
+        self._dirty = False
+
+    def _load_index(self):
+        if not self.path.exists():
+            return
+        offset = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    filename = record['filename']
+                except (ValueError, KeyError, TypeError):
+                    # A line cut short by a crash: drop it and everything after it
+                    break
+                previous = self._index.pop(filename, None)
+                if previous:
+                    self._dead_bytes += previous[1]
+                if record.get('deleted'):
+                    self._dead_bytes += len(line)
+                else:
+                    self._index[filename] = (offset, len(line))
+                offset += len(line)
+        if offset < self.path.stat().st_size:
+            os.truncate(self.path, offset)
+
+    def _append(self, record: dict) -> Tuple[int, int]:
+        line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+        offset = self._writer.tell()
+        self._writer.write(line)
+        self._dirty = True
+        return offset, len(line)
+
+    def write(self, filename: str, record: dict) -> str:
+        with self._lock:
+            previous = self._index.get(filename)
+            if previous:
+                self._dead_bytes += previous[1]
+            self._index[filename] = self._append(dict(record, filename=filename))
+        return page_document(record)
+
+    def contains(self, filename: str) -> bool:
+        return filename in self._index
+
+    def record(self, filename: str) -> Optional[dict]:
+        with self._lock:
+            location = self._index.get(filename)
+            if location is None:
+                return None
+            if self._dirty:
+                self._writer.flush()
+                self._dirty = False
+            if self._reader is None:
+                self._reader = open(self.path, 'rb')
+            self._reader.seek(location[0])
+            return json.loads(self._reader.read(location[1]))
+
+    def read(self, filename: str) -> Optional[bytes]:
+        record = self.record(filename)
+        return page_document(record).encode('utf-8') if record else None
+
+    def remove(self, filename: str):
+        with self._lock:
+            previous = self._index.pop(filename, None)
+            if previous:
+                self._dead_bytes += previous[1]
+                self._dead_bytes += self._append({'filename': filename, 'deleted': True})[1]
+
+    def records(self) -> Iterator[dict]:
+        """The current record of every stored page, in filename order"""
+        for filename in sorted(self._index):
+            record = self.record(filename)
+            if record:
+                yield record
+
+    def flush(self):
+        with self._lock:
+            self._writer.flush()
+            self._dirty = False
+
+    def compact(self):
+        """Rewrite the file with only the current record of each page"""
+        with self._lock:
+            self._writer.flush()
+            locations = sorted(self._index.items(), key=lambda item: item[1][0])
+            tmp_path = self.path.with_suffix('.tmp')
+            index = {}
+            with open(self.path, 'rb') as source, open(tmp_path, 'wb') as target:
+                for filename, (offset, length) in locations:
+                    source.seek(offset)
+                    index[filename] = (target.tell(), length)
+                    target.write(source.read(length))
+            self._writer.close()
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+            os.replace(tmp_path, self.path)
+            self._writer = open(self.path, 'ab', buffering=self.buffer_size)
+            self._index = index
+            self._dead_bytes = 0
+
+    def close(self):
+        if self._writer.closed:
+            return
+        live = sum(length for _, length in self._index.values())
+        if self._dead_bytes > live:
+            self.compact()
+        with self._lock:
+            self._writer.close()
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+
+
+class SqliteStore:
+    """pages.sqlite with one row per page, written in batched transactions.
+
+    Writes from every thread share one connection and are committed every
+    `commit_every` pages and on flush(), so a crash loses at most the last
+    uncommitted batch (those pages are fetched again on resume).
+    """
+
+    FORMAT = 'sqlite'
+    FILENAME = 'pages.sqlite'
+
+    def __init__(self, output_dir: Path, commit_every: int = 200):
+        self.path = Path(output_dir) / self.FILENAME
+        self.commit_every = commit_every
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS pages (filename TEXT PRIMARY KEY, title TEXT, '
+                           'source_url TEXT, scraped_at TEXT, scraper_version TEXT, markdown TEXT NOT NULL)')
+        self._conn.commit()
+
+    def write(self, filename: str, record: dict) -> str:
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO pages (filename, title, source_url, scraped_at, scraper_version, markdown) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (filename, *(record.get(field) for field in METADATA_FIELDS), record['markdown']))
+            self._pending += 1
+            if self._pending >= self.commit_every:
+                self._conn.commit()
+                self._pending = 0
+        return page_document(record)
+
+    def contains(self, filename: str) -> bool:
+        with self._lock:
+            return self._conn.execute('SELECT 1 FROM pages WHERE filename = ?', (filename,)).fetchone() is not None
+
+    def record(self, filename: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT filename, title, source_url, scraped_at, scraper_version, markdown '
+                'FROM pages WHERE filename = ?', (filename,)).fetchone()
+        return self._to_record(row) if row else None
+
+    @staticmethod
+    def _to_record(row) -> dict:
+        return dict(zip(('filename',) + METADATA_FIELDS + ('markdown',), row))
+
+    def read(self, filename: str) -> Optional[bytes]:
+        record = self.record(filename)
+        return page_document(record).encode('utf-8') if record else None
+
+    def remove(self, filename: str):
+        with self._lock:
+            self._conn.execute('DELETE FROM pages WHERE filename = ?', (filename,))
+            self._pending += 1
+
+    def records(self) -> Iterator[dict]:
+        with self._lock:
+            filenames = [row[0] for row in self._conn.execute('SELECT filename FROM pages ORDER BY filename')]
+        for filename in filenames:
+            record = self.record(filename)
+            if record:
+                yield record
+
+    def flush(self):
+        with self._lock:
+            self._conn.commit()
+            self._pending = 0
+
+    def close(self):
+        with self._lock:
+            try:
+                self._conn.commit()
+            except sqlite3.ProgrammingError:
+                # Already closed
+                return
+            self._conn.close()
+
+
+STORES = {store.FORMAT: store for store in (FileStore, JsonlStore, SqliteStore)}
+OUTPUT_FORMATS = tuple(STORES)
+
+
+def open_store(output_dir: Path, output_format: str = 'files'):
+    """The page store for an output directory in the given format"""
+    if output_format not in STORES:
+        raise ValueError(f"Unknown output format: {output_format}")
+    return STORES[output_format](output_dir)
+
+
+def bundle_format(output_dir: Path) -> Optional[str]:
+    """Format of the page bundle in output_dir, or None if pages are plain files"""
+    for store in (JsonlStore, SqliteStore):
+        if (Path(output_dir) / store.FILENAME).is_file():
+            return store.FORMAT
+    return None
+
+
+def export_files(output_dir: Path, destination: Optional[Path] = None) -> int:
+    """Write every page of output_dir's bundle as a markdown file, in the per-file layout.
+
+    Files go into destination (default: output_dir itself). Returns the
+    number of pages written.
+    """
+    output_format = bundle_format(output_dir)
+    if output_format is None:
+        raise ValueError(f"No page bundle in {output_dir}")
+    destination = Path(destination or output_dir)
+    destination.mkdir(parents=True, exist_ok=True)
+    bundle = open_store(output_dir, output_format)
+    files = FileStore(destination)
+    count = 0
+    try:
+        for record in bundle.records():
+            files.write(record['filename'], record)
+            count += 1
+    finally:
+        bundle.close()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export a JSONL or SQLite page bundle to markdown files')
+    parser.add_argument('output_dir', help='Scrape output directory holding pages.jsonl or pages.sqlite')
+    parser.add_argument('--to', metavar='DIRECTORY', default=None,
+                        help='Where to write the files (default: the output directory)')
+    args = parser.parse_args()
+
+    try:
+        count = export_files(Path(args.output_dir), args.to and Path(args.to))
+    except ValueError as e:
+        sys.exit(str(e))
+    print(f"Exported {count} pages to {args.to or args.output_dir}")
+
+
+if __name__ == '__main__':
+    main()
@@ -6,66 +6,199 @@ A flexible web scraper for converting any documentation site to markdown files.
 
 import requests
 from bs4 import BeautifulSoup
-import markdownify
 import os
+import sys
 import time
 import re
 import json
+import hashlib
 import argparse
+from itertools import chain
+import threading
+from collections import deque
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import contextmanager, nullcontext, ExitStack
 from urllib.parse import urljoin, urlparse
 from pathlib import Path
-import xml.etree.ElementTree as ET
-from typing import List, Set, Dict, Optional
+from typing import List, Set, Dict, Optional, Iterable, Iterator, Tuple, Callable, NamedTuple
 import logging
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+
+# Allow importing sibling modules when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scraper.checkpoint import DONE, CrawlCheckpoint
+from scraper.chunks import DEFAULT_CHUNK_SIZE, ChunkWriter
+from scraper.combined import CombinedDocument
+from scraper.dedup import DuplicateDetector
+from scraper.frontier import CrawlFrontier, canonicalize_url
+from scraper.httpcache import CacheStats, HttpCache
+from scraper.links import extract_page_links
+from scraper.manifest import PageManifest, content_hash
+from scraper.metrics import Profiler, ScrapeMetrics
+from scraper.search import SearchIndex
+from scraper.ratelimit import THROTTLE_STATUSES, AdaptiveRateLimiter, parse_crawl_delay
+from scraper.converter import (CONTENT_SELECTORS, HTML_PARSERS, MARKDOWN_ENGINES, REMOVE_SELECTORS,
+                               RenderOptions, SiteProfile,
+                               extract_content, extract_links, render_page)
+from scraper.sitemap import SitemapEntry, SitemapReader, SitemapScheduler, parse_lastmod
+from scraper.store import OUTPUT_FORMATS, open_store, page_markdown
+
+# Response bodies are read in chunks of this size, checking for cancellation in between
+READ_CHUNK_SIZE = 64 * 1024
+
+# Content types converted as documentation pages; other page responses are dropped unread
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+DEFAULT_MAX_PAGE_SIZE = 10 * 1024 * 1024
+
+
+class ScrapeCancelled(requests.RequestException):
+    """Raised by fetches once the scrape has been cancelled"""
+
+
+class ResponseRejected(requests.RequestException):
+    """Raised by page fetches for a non-HTML or oversized response before its body is (fully) read.
+    
+    `reason` is 'non_html' or 'too_large'; `avoided` is the number of body
+    bytes not downloaded, when the server announced a Content-Length.
+    """
+    
+    def __init__(self, message: str, reason: str, avoided: int = 0):
+        super().__init__(message)
+        self.reason = reason
+        self.avoided = avoided
+
+
+class FetchedPage(NamedTuple):
+    """A downloaded page waiting for the parse/convert stage"""
+    url: str
+    content: bytes
+    digest: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    collect_links: bool
+    # Internal links read off the raw HTML when collect_links is set
+    links: List[str]
+
 
 class UniversalDocsScraper:
     def __init__(self, base_url: str, output_dir: str = "scraped_docs", 
-                 rate_limit: float = 1.0, max_pages: int = 1000):
+                 rate_limit: float = 1.0, max_pages: int = 1000,
+                 concurrency: int = 1, per_host_limit: Optional[int] = None,
+                 max_depth: Optional[int] = None, ignore_query: bool = False,
+                 workers: int = 0, markdown_engine: str = 'tree',
+                 html_parser: str = 'html.parser', resume: bool = False,
+                 logger: Optional[logging.Logger] = None,
+                 http_cache: Optional[HttpCache] = None,
+                 metrics: Optional[ScrapeMetrics] = None,
+                 profiler: Optional[Profiler] = None,
+                 output_format: str = 'files', search_index: bool = False,
+                 chunks: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 max_page_size: Optional[int] = DEFAULT_MAX_PAGE_SIZE):
+        if markdown_engine not in MARKDOWN_ENGINES:
+            raise ValueError(f"Unknown markdown engine: {markdown_engine}")
+        if html_parser not in HTML_PARSERS:
+            raise ValueError(f"Unknown HTML parser: {html_parser}")
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format: {output_format}")
         self.base_url = base_url.rstrip('/')
         self.output_dir = Path(output_dir)
         self.rate_limit = rate_limit
         self.max_pages = max_pages
+        self.concurrency = max(1, concurrency)
+        self.workers = max(0, workers)
+        self.per_host_limit = max(1, per_host_limit or self.concurrency)
+        self.max_depth = max_depth
+        self.ignore_query = ignore_query
+        self.markdown_engine = markdown_engine
+        self.html_parser = html_parser
+        self.resume = resume
+        self.output_format = output_format
+        self.max_page_size = max_page_size or None
+        self._base_prefix = canonicalize_url(self.base_url).rstrip('/')
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (compatible; UniversalDocsScraper/1.0; +https://github.com/yourusername/universal-docs-scraper)'
         })
+        
+        # Size the connection pool so every worker can keep its connection alive
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=max(10, self.concurrency))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
         self.visited_urls: Set[str] = set()
         self.scraped_count = 0
+        # Pages being fetched or converted, as of the last time the worker pool asked for a URL
+        self._in_flight = 0
+        self.discovered_count = 0
+        self._lock = threading.Lock()
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        # rate_limit is the fastest each fetch slot may go; actual pace follows server feedback
+        self.rate_limiter = AdaptiveRateLimiter(rate_limit, self.per_host_limit)
+        self._robots_txt: Optional[str] = None
+        self._cancelled = threading.Event()
+        
+        # Optional response cache, possibly shared with other scraper instances
+        self.http_cache = http_cache
+        self.cache_stats = CacheStats()
+        
+        # Per-stage timings and counters; with --profile, a cProfile of the worker threads too
+        self.metrics = metrics or ScrapeMetrics()
+        self.profiler = profiler
         
         # Create output directory
         self.output_dir.mkdir(exist_ok=True)
         
+        # Saved pages: one file each, or one JSONL/SQLite bundle for the whole site
+        self.store = open_store(self.output_dir, output_format)
+        
+        # Optional section-level full-text index, filled in as pages are saved
+        self.search_index = SearchIndex(self.output_dir) if search_index else None
+        
+        # Optional JSONL stream of heading-aware chunks of every kept page, for retrieval pipelines
+        self.chunk_writer = ChunkWriter(chunks, chunk_size, append=resume) if chunks else None
+        
+        # What earlier runs saved here, for conditional and skip-if-unchanged fetches
+        self.manifest = PageManifest(self.output_dir, self.store)
+        # Which URL each output filename belongs to, so different URLs never share a file
+        self._filename_owners = {entry['filename'].lower(): url for url, entry in self.manifest.entries.items()
+                                 if entry.get('filename')}
+        
+        # Content already kept in this run, so pages served under several URLs are saved once
+        self.dedup = DuplicateDetector(load_text=self._kept_markdown)
+        
+        # COMBINED_DOCUMENTATION.md is assembled from pages as they are saved
+        self.combined = CombinedDocument(self.output_dir, self.store)
+        
+        # Periodic record of the frontier and finished URLs, for --resume
+        self.checkpoint = CrawlCheckpoint(self.output_dir)
+        self.resumed: List[Tuple[str, bool]] = []
+        
         # Setup logging
-        self.setup_logging()
-        
-        # Content selectors for different documentation platforms
-        self.content_selectors = [
-            # Readme.com
-            '.readme-content', '[data-testid="readme-content"]', '.hub-content-body',
-            # GitBook
-            '.markdown-section', '.page-wrapper', 
-            # Docusaurus
-            '.markdown', 'article', '.docMainContainer',
-            # MkDocs
-            '.md-content', '.content',
-            # Sphinx
-            '.document', '.body',
-            # Generic
-            'main', '[role="main"]', '.main-content', '.documentation-content',
-            '#content', '.content-wrapper'
-        ]
+        self.setup_logging(logger)
         
-        # Elements to remove
-        self.remove_selectors = [
-            'nav', 'header', 'footer', '.sidebar', '.navigation', '.toc',
-            '.breadcrumbs', '.edit-page', '.feedback', '.rating',
-            '[class*="sidebar"]', '[class*="navigation"]', '[class*="footer"]'
-        ]
+        # Content selectors for different documentation platforms, and elements to remove
+        self.content_selectors = list(CONTENT_SELECTORS)
+        self.remove_selectors = list(REMOVE_SELECTORS)
+        
+        # Platform, content selector and removals learned from the first pages
+        self.site_profile = SiteProfile(self.remove_selectors)
+        
+    def setup_logging(self, logger: Optional[logging.Logger] = None):
+        """Setup logging configuration.
         
-    def setup_logging(self):
-        """Setup logging configuration"""
+        A logger passed in (e.g. one per web session) is used as-is, apart
+        from writing this scrape's scraper.log; close() detaches that file again.
+        """
         log_file = self.output_dir / 'scraper.log'
+        self._log_file_handler = None
+        if logger is not None:
+            self._log_file_handler = logging.FileHandler(log_file)
+            self._log_file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+            logger.addHandler(self._log_file_handler)
+            self.logger = logger
+            return
         logging.basicConfig(
             level=logging.INFO,
             format='%(asctime)s - %(levelname)s - %(message)s',
@@ -76,121 +209,246 @@ class UniversalDocsScraper:
         )
         self.logger = logging.getLogger(__name__)
         
+    @contextmanager
+    def host_slot(self, url: str):
+        """Hold one of the per-host concurrency slots for the URL's host"""
+        host = urlparse(url).netloc
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+        with slot:
+            yield
+    
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+    
+    def cancel(self):
+        """Stop the scrape from another thread.
+        
+        No new pages are started, rate-limit waits end at once and fetches
+        in progress are abandoned at their next chunk with ScrapeCancelled.
+        Pages already finished stay checkpointed, so the scrape can be resumed.
+        """
+        if not self._cancelled.is_set():
+            self._cancelled.set()
+            self.logger.warning(f"Cancelling scrape of {self.base_url}")
+    
+    def _check_cancelled(self, url: str):
+        if self._cancelled.is_set():
+            raise ScrapeCancelled(f"Scrape cancelled before {url} finished")
+    
+    def fetch(self, url: str, timeout: float = 15,
+              headers: Optional[Dict[str, str]] = None,
+              stream: bool = False, retries: int = 2, as_page: bool = False) -> requests.Response:
+        """GET a URL through the shared session, respecting the per-host and adaptive rate limits.
+        
+        Every response is fed back to the host's rate limiter. A 429 or 503
+        is retried up to `retries` times, after the Retry-After delay.
+        Unless `stream` is set the body is downloaded before returning, in
+        chunks, so that cancel() can interrupt a slow transfer, and with an
+        HTTP cache the response may come from (or be revalidated against) it.
+        
+        With `as_page`, a 200 response whose headers say it is not HTML or
+        larger than max_page_size raises ResponseRejected without its body
+        being read, as does a body that grows past max_page_size.
+        """
+        if self.http_cache is not None and not stream:
+            return self.http_cache.get(
+                url, headers,
+                lambda request_headers: self._fetch(url, timeout, request_headers, False, retries, as_page),
+                self.cache_stats)
+        return self._fetch(url, timeout, headers, stream, retries, as_page)
+    
+    def _fetch(self, url: str, timeout: float, headers: Optional[Dict[str, str]],
+               stream: bool, retries: int, as_page: bool = False) -> requests.Response:
+        for attempt in range(retries + 1):
+            with self.metrics.time('rate_limit_wait'):
+                self.rate_limiter.acquire(url, self._cancelled)
+            self._check_cancelled(url)
+            self.metrics.count('requests')
+            with self.host_slot(url), self.metrics.time('fetch'):
+                try:
+                    response = self.session.get(url, timeout=timeout, headers=headers, stream=True)
+                    final = response.status_code not in THROTTLE_STATUSES or attempt == retries
+                    if final and not stream:
+                        if as_page and response.status_code == 200:
+                            self._check_page_headers(response)
+                        self._read_body(response, self.max_page_size if as_page else None)
+                        self.metrics.count('bytes_downloaded', len(response.content))
+                except ScrapeCancelled:
+                    raise
+                except ResponseRejected as e:
+                    # The server answered fine; the page just isn't one we want
+                    self.rate_limiter.feedback(url, response.status_code, response.elapsed.total_seconds())
+                    self.metrics.count(f'rejected_{e.reason}')
+                    self.metrics.count('bytes_avoided', e.avoided)
+                    raise
+                except requests.RequestException:
+                    self.metrics.count('request_errors')
+                    self.rate_limiter.feedback(url, None, timeout)
+                    raise
+            self.rate_limiter.feedback(url, response.status_code, response.elapsed.total_seconds(),
+                                       response.headers.get('Retry-After'))
+            if final:
+                return response
+            response.close()
+            self.metrics.count('throttled')
+            self.logger.warning(f"HTTP {response.status_code} for {url}, backing off before retrying")
+    
+    @staticmethod
+    def _content_length(response: requests.Response) -> Optional[int]:
+        try:
+            return int(response.headers['Content-Length'])
+        except (KeyError, ValueError):
+            return None
+    
+    def _check_page_headers(self, response: requests.Response):
+        """Reject a page response by its Content-Type and Content-Length, before reading the body"""
+        content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        length = self._content_length(response)
+        if content_type and content_type not in HTML_CONTENT_TYPES:
+            response.close()
+            raise ResponseRejected(f"not HTML ({content_type})", 'non_html', length or 0)
+        if self.max_page_size and length is not None and length > self.max_page_size:
+            response.close()
+            raise ResponseRejected(f"{length} bytes, over the {self.max_page_size} byte page limit",
+                                   'too_large', length)
+    
+    def _read_body(self, response: requests.Response, limit: Optional[int] = None):
+        """Load the response body the way requests does, checking for cancellation between chunks.
+        
+        With a limit, reading stops with ResponseRejected as soon as the
+        (decoded) body grows past it.
+        """
+        chunks = []
+        size = 0
+        try:
+            for chunk in response.iter_content(READ_CHUNK_SIZE):
+                self._check_cancelled(response.url)
+                size += len(chunk)
+                if limit and size > limit:
+                    length = self._content_length(response)
+                    raise ResponseRejected(f"body over the {limit} byte page limit", 'too_large',
+                                           max(0, length - size) if length else 0)
+                chunks.append(chunk)
+        except BaseException:
+            response.close()
+            raise
+        response._content = b''.join(chunks)
+        
+    def load_robots(self):
+        """Fetch robots.txt once, applying its Crawl-delay to the rate limiter"""
+        robots_url = urljoin(self.base_url, '/robots.txt')
+        try:
+            with self.metrics.time('robots'):
+                response = self.fetch(robots_url, timeout=10)
+        except requests.RequestException as e:
+            self.logger.debug(f"Could not fetch robots.txt: {e}")
+            self._robots_txt = ''
+            return
+        self._robots_txt = response.text if response.status_code == 200 else ''
+        delay = parse_crawl_delay(self._robots_txt, self.session.headers['User-Agent'])
+        if delay:
+            self.logger.info(f"🐢 robots.txt asks for a Crawl-delay of {delay}s")
+            self.rate_limiter.set_crawl_delay(self.base_url, delay)
+        
     def get_sitemap_urls(self) -> List[str]:
         """Try to find and parse sitemap URLs"""
+        return [entry.loc for entry in self.iter_sitemap_entries()]
+    
+    def iter_sitemap_entries(self) -> Iterator[SitemapEntry]:
+        """Stream unique sitemap entries from robots.txt and the common sitemap locations.
+        
+        All locations are probed at once and child sitemaps are fetched
+        concurrently, so entries arrive while later sitemaps are still loading.
+        """
         sitemap_locations = [
             '/sitemap.xml',
             '/sitemap_index.xml',
             '/sitemap-index.xml',
-            '/sitemaps/sitemap.xml',
-            '/robots.txt'  # Check robots.txt for sitemap location
+            '/sitemaps/sitemap.xml'
         ]
         
-        all_urls = set()
-        
-        # First check robots.txt
-        try:
-            robots_url = urljoin(self.base_url, '/robots.txt')
-            response = self.session.get(robots_url, timeout=10)
-            if response.status_code == 200:
-                for line in response.text.splitlines():
-                    if line.lower().startswith('sitemap:'):
-                        sitemap_url = line.split(':', 1)[1].strip()
-                        urls = self.parse_sitemap(sitemap_url)
-                        all_urls.update(urls)
-        except Exception as e:
-            self.logger.debug(f"Could not fetch robots.txt: {e}")
-        
-        # Try common sitemap locations
-        for location in sitemap_locations:
-            sitemap_url = urljoin(self.base_url, location)
-            urls = self.parse_sitemap(sitemap_url)
-            all_urls.update(urls)
-            
-        return list(all_urls)
+        reader = SitemapReader(self.fetch, logger=self.logger)
+        count = 0
+        with self.metrics.time('sitemap_discovery'):
+            for entry in reader.iter_entries(
+                    [urljoin(self.base_url, location) for location in sitemap_locations],
+                    robots_url=urljoin(self.base_url, '/robots.txt'), robots_txt=self._robots_txt):
+                count += 1
+                self.discovered_count = count
+                yield entry
     
     def parse_sitemap(self, sitemap_url: str) -> Set[str]:
-        """Parse a sitemap and return URLs"""
-        urls = set()
-        try:
-            response = self.session.get(sitemap_url, timeout=10)
-            if response.status_code == 200:
-                root = ET.fromstring(response.content)
-                
-                # Handle namespaces
-                namespaces = {'ns': 'http://www.sitemaps.org/schemas/sitemap/0.9'}
-                
-                # Check if it's a sitemap index
-                sitemaps = root.findall('.//ns:sitemap', namespaces)
-                if sitemaps:
-                    for sitemap in sitemaps:
-                        loc = sitemap.find('ns:loc', namespaces)
-                        if loc is not None:
-                            sub_urls = self.parse_sitemap(loc.text)
-                            urls.update(sub_urls)
-                else:
-                    # Direct sitemap with URLs
-                    for url_elem in root.findall('.//ns:url', namespaces):
-                        loc = url_elem.find('ns:loc', namespaces)
-                        if loc is not None:
-                            urls.add(loc.text)
-                            
-        except Exception as e:
-            self.logger.debug(f"Could not parse sitemap {sitemap_url}: {e}")
-            
-        return urls
+        """Parse a sitemap (following any sitemap index) and return URLs"""
+        reader = SitemapReader(self.fetch, logger=self.logger)
+        return {entry.loc for entry in reader.iter_entries([sitemap_url])}
     
     def discover_urls_by_crawling(self) -> List[str]:
         """Discover URLs by crawling the site"""
         self.logger.info("Starting URL discovery through crawling...")
         
-        to_visit = [self.base_url]
-        discovered = set()
+        with self.metrics.time('crawl_discovery'):
+            return self._discover_by_crawling()
+    
+    def _discover_by_crawling(self) -> List[str]:
+        frontier = self.new_frontier()
+        discovered = []
         
-        while to_visit and len(discovered) < self.max_pages:
-            url = to_visit.pop(0)
-            if url in discovered:
-                continue
+        while len(discovered) < self.max_pages:
+            item = frontier.pop()
+            if item is None:
+                break
+            url, depth = item
                 
             try:
-                response = self.session.get(url, timeout=10)
+                response = self.fetch(url, timeout=10, as_page=True)
                 if response.status_code == 200:
-                    discovered.add(url)
-                    soup = BeautifulSoup(response.content, 'html.parser')
+                    discovered.append(url)
                     
-                    # Find all internal links
-                    for link in soup.find_all('a', href=True):
-                        href = link['href']
-                        full_url = urljoin(url, href)
-                        
-                        # Only process internal links
-                        if (full_url.startswith(self.base_url) and 
-                            full_url not in discovered and 
-                            not any(ext in full_url for ext in ['.pdf', '.zip', '.png', '.jpg', '.gif'])):
-                            to_visit.append(full_url)
-                    
-                    time.sleep(self.rate_limit)
+                    # Find all internal links, without parsing the whole page
+                    for full_url in extract_page_links(response.content, url, self._base_prefix,
+                                                       self.ignore_query,
+                                                       response.headers.get('Content-Type')):
+                        frontier.add(full_url, depth + 1)
                     
+            except ResponseRejected as e:
+                self.logger.info(f"⏭️  Skipping {url}: {e}")
             except Exception as e:
                 self.logger.error(f"Error crawling {url}: {e}")
                 
-        return list(discovered)
+        return discovered
+    
+    def new_frontier(self) -> CrawlFrontier:
+        """Create a crawl frontier seeded with the base URL"""
+        frontier = CrawlFrontier(max_depth=self.max_depth, ignore_query=self.ignore_query)
+        frontier.add(self.base_url)
+        return frontier
+    
+    def extract_links(self, soup: BeautifulSoup, page_url: str) -> List[str]:
+        """Return the canonical internal, non-binary links found on a page"""
+        return extract_links(soup, page_url, self._base_prefix, self.ignore_query)
     
     def extract_content(self, soup: BeautifulSoup) -> Optional[BeautifulSoup]:
         """Extract main content from the page"""
-        # First, remove unwanted elements
-        for selector in self.remove_selectors:
-            for elem in soup.select(selector):
-                elem.decompose()
-        
-        # Try to find main content
-        for selector in self.content_selectors:
-            content = soup.select_one(selector)
-            if content:
-                return content
-                
-        # Fallback: use body
-        return soup.find('body')
+        return extract_content(soup, self.content_selectors, self.remove_selectors)
+    
+    def render_options(self, collect_links: bool = False) -> RenderOptions:
+        """Snapshot of the conversion settings, safe to send to a worker process"""
+        profile = self.site_profile
+        return RenderOptions(
+            content_selectors=tuple(self.content_selectors),
+            remove_selectors=tuple(self.remove_selectors),
+            base_prefix=self._base_prefix,
+            ignore_query=self.ignore_query,
+            collect_links=collect_links,
+            profile_selector=profile.selector,
+            profile_remove=profile.remove if profile.selector else (),
+            markdown_engine=self.markdown_engine,
+            parser=self.html_parser
+        )
     
     def clean_filename(self, url: str) -> str:
         """Create a clean filename from URL"""
@@ -210,127 +468,516 @@ class UniversalDocsScraper:
             
         return filename
     
+    def claim_filename(self, url: str) -> str:
+        """clean_filename(url), made unique among this directory's pages.
+        
+        Different paths can flatten to the same name ('a/b_c' and 'a_b/c'),
+        or differ only in case; the second URL to claim a name gets a short
+        hash of itself appended instead of overwriting the first page.
+        """
+        filename = self.clean_filename(url)
+        with self._lock:
+            owner = self._filename_owners.setdefault(filename.lower(), url)
+            if owner == url:
+                return filename
+            filename = f"{filename[:-3]}-{hashlib.sha1(url.encode('utf-8')).hexdigest()[:8]}.md"
+            self._filename_owners.setdefault(filename.lower(), url)
+            return filename
+    
     def scrape_page(self, url: str) -> bool:
         """Scrape a single page"""
+        return self._scrape(url)[0]
+    
+    def _scrape(self, url: str, collect_links: bool = False) -> Tuple[bool, List[str]]:
+        """Fetch, convert and save a page; optionally also return its internal links.
+        
+        Links are read from the same download at fetch time, so a crawl
+        never has to download a page twice.
+        """
+        result = self._fetch_page(url, collect_links)
+        if not isinstance(result, FetchedPage):
+            return result
+        
+        try:
+            rendered = render_page(result.content, url, self.render_options())
+        except Exception as e:
+            self.dedup.release_body(url, result.digest)
+            return self._scrape_failed(url, e, result.links)
+        return self._save_page(result, rendered)
+    
+    def _fetch_page(self, url: str, collect_links: bool = False):
+        """Fetch stage: return a FetchedPage to convert, or a final (success, links) result.
+        
+        Pages answered with 304 or an unchanged body are settled here
+        without ever being parsed. With collect_links, the links of a page
+        that still needs converting are read off the HTML tokenizer here,
+        which is much cheaper than taking them from the parsed tree.
+        """
         try:
             self.logger.info(f"Scraping: {url}")
-            response = self.session.get(url, timeout=15)
+            response = self.fetch(url, timeout=15,
+                                  headers=self.manifest.conditional_headers(url, collect_links),
+                                  as_page=True)
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            
+            if response.status_code == 304:
+                return True, self._keep_unchanged(url, etag, last_modified)
             
             if response.status_code != 200:
+                self.metrics.count('pages_failed')
                 self.logger.error(f"HTTP {response.status_code} for {url}")
-                return False
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
+                if response.status_code not in (404, 410):
+                    self.manifest.mark_failed(url)
+                return False, []
             
-            # Extract title
-            title = "Untitled"
-            title_elem = soup.find('title')
-            if title_elem:
-                title = title_elem.get_text().strip()
+            # Identical body to the saved version: skip parsing, conversion and the write
+            digest = content_hash(response.content)
+            if self.manifest.is_unchanged(url, digest, collect_links):
+                return True, self._keep_unchanged(url, etag, last_modified)
             
-            # Extract main content
-            content = self.extract_content(soup)
-            if not content:
-                self.logger.warning(f"No content found for {url}")
-                return False
+            # Byte-identical to a page already kept under another URL: no need to parse it
+            original = self.dedup.check_body(url, digest)
+            if original:
+                return True, self._keep_duplicate(url, original)
             
-            # Convert to markdown
-            markdown_content = markdownify.markdownify(
-                str(content),
-                heading_style="ATX",
-                bullets="-",
-                code_language="",
-                strip=['img', 'script', 'style']
-            )
+            links = []
+            if collect_links:
+                with self.metrics.time('links'):
+                    links = extract_page_links(response.content, url, self._base_prefix, self.ignore_query,
+                                               response.headers.get('Content-Type'))
+            return FetchedPage(url, response.content, digest, etag, last_modified, collect_links, links)
             
-            # Clean up markdown
-            markdown_content = re.sub(r'\n\s*\n\s*\n', '\n\n', markdown_content)
-            markdown_content = markdown_content.strip()
+        except ScrapeCancelled:
+            # Not a failure of the page: it is fetched again when the scrape is resumed
+            return False, []
+        except ResponseRejected as e:
+            self.logger.info(f"⏭️  Skipping {url}: {e}")
+            return False, []
+        except Exception as e:
+            return self._scrape_failed(url, e)
+    
+    def _save_page(self, page: 'FetchedPage', rendered: dict) -> Tuple[bool, List[str]]:
+        """Write stage: store converted markdown with its metadata"""
+        url = page.url
+        links = page.links
+        for stage, seconds in rendered['timings'].items():
+            self.metrics.observe(stage, seconds)
+        self.site_profile.observe(rendered['platform'], rendered['selector'], rendered['used_profile'])
+        try:
+            title = rendered['title']
+            markdown_content = rendered['markdown']
+            if markdown_content is None:
+                self.dedup.release_body(url, page.digest)
+                self.logger.warning(f"No content found for {url}")
+                return False, links
             
-            # Save file
-            filename = self.clean_filename(url)
-            filepath = self.output_dir / filename
+            # Same (or nearly the same) text as a page already kept: don't save or follow it
+            text_digest, simhash_value = rendered['fingerprint']
+            original = self.dedup.check_text(url, page.digest, text_digest, simhash_value, markdown_content)
+            if original:
+                return True, self._keep_duplicate(url, original)
             
-            # Add metadata
-            metadata = {
+            # Save the page with its metadata
+            filename = self.claim_filename(url)
+            record = {
                 'title': title,
                 'source_url': url,
                 'scraped_at': datetime.now().isoformat(),
-                'scraper_version': '1.0.0'
+                'scraper_version': '1.0.0',
+                'markdown': markdown_content
             }
             
-            final_content = f"""---
-{json.dumps(metadata, indent=2)}
----
-
-# {title}
-
-{markdown_content}
-"""
-            
-            # Ensure parent directory exists
-            filepath.parent.mkdir(parents=True, exist_ok=True)
+            with self.metrics.time('write'):
+                final_content = self.store.write(filename, record)
+                self.combined.add(filename, final_content)
+            if self.search_index is not None:
+                with self.metrics.time('index'):
+                    self.search_index.add_page(filename, url, title, final_content)
+            if self.chunk_writer is not None:
+                with self.metrics.time('chunk'):
+                    self.chunk_writer.write_page(url, title, final_content)
             
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(final_content)
-            
-            self.scraped_count += 1
+            self.manifest.record(url, filename, page.digest, title, page.etag,
+                                 page.last_modified, links if page.collect_links else None,
+                                 text_digest, simhash_value)
+            with self._lock:
+                self.scraped_count += 1
+            self.metrics.count('pages_saved')
             self.logger.info(f"✅ Saved as {filename}")
-            return True
+            return True, links
             
         except Exception as e:
-            self.logger.error(f"Error scraping {url}: {e}")
-            return False
+            self.dedup.release_body(url, page.digest)
+            return self._scrape_failed(url, e, links)
+    
+    def _scrape_failed(self, url: str, error: Exception,
+                       links: Optional[List[str]] = None) -> Tuple[bool, List[str]]:
+        self.logger.error(f"Error scraping {url}: {error}")
+        self.metrics.count('pages_failed')
+        self.manifest.mark_failed(url)
+        return False, links or []
+    
+    def _keep_unchanged(self, url: str, etag: Optional[str],
+                        last_modified: Optional[str], verified: bool = True) -> List[str]:
+        """Count a page whose saved copy is still current; returns its recorded links"""
+        entry = self.manifest.mark_unchanged(url, etag, last_modified, verified)
+        original = self.dedup.register(url, entry)
+        if original:
+            return self._keep_duplicate(url, original)
+        with self._lock:
+            self.scraped_count += 1
+        self.metrics.count('pages_unchanged')
+        self.logger.info(f"⏭️  Unchanged, keeping {entry['filename']} ({url})")
+        if self.chunk_writer is not None:
+            # Re-chunked from the saved copy: same text, so the same chunk IDs as before
+            document = self.store.read(entry['filename'])
+            if document is not None:
+                with self.metrics.time('chunk'):
+                    self.chunk_writer.write_page(url, entry.get('title') or 'Untitled',
+                                                 document.decode('utf-8'))
+        return entry.get('links', [])
+    
+    def _kept_markdown(self, url: str) -> Optional[str]:
+        """Markdown of the page saved for url, for confirming near-duplicates"""
+        entry = self.manifest.get(url)
+        document = self.store.read(entry['filename']) if entry else None
+        return page_markdown(document.decode('utf-8', errors='replace')) if document is not None else None
+    
+    def _keep_duplicate(self, url: str, original: str) -> List[str]:
+        """Drop a page whose content was already kept under another URL; its links are not followed"""
+        self.manifest.mark_duplicate(url)
+        self.metrics.count('pages_duplicate')
+        self.logger.info(f"♻️  Duplicate of {original}, not saved ({url})")
+        return []
+    
+    def _scrape_worker(self, url: str, collect_links: bool = False, fetch_only: bool = False):
+        """Scrape (or with fetch_only, just fetch) one page on a worker thread"""
+        with self.profiler.thread() if self.profiler else nullcontext():
+            if fetch_only:
+                return self._fetch_page(url, collect_links)
+            return self._scrape(url, collect_links)
+    
+    def _run_workers(self, next_url: Callable[[], Optional[str]], collect_links: bool = False,
+                     on_links: Optional[Callable[[str, List[str]], None]] = None
+                     ) -> Iterator[Tuple[str, Tuple[bool, List[str]]]]:
+        """Feed URLs from next_url() to a bounded worker pool, yielding results as pages finish.
+        
+        At most `concurrency` pages are being fetched at once and no more
+        than `max_pages` pages are saved. next_url() is polled again after
+        every result, so callers may keep adding work while the pool runs.
+        After cancel() no new URLs are taken and the pages in flight wind down.
+        
+        With `workers` > 0 the pipeline has separate stages: threads fetch,
+        a process pool parses and converts, and this thread writes. Fetching
+        pauses while the conversion backlog is full. A fetched page's links
+        are handed to on_links(url, links) as soon as it is downloaded, so
+        the crawl frontier grows without waiting for conversion.
+        """
+        fetching = {}
+        converting = {}
+        started = {}
+        fetch_only = self.workers > 0
+        
+        with ExitStack() as stack:
+            pool = stack.enter_context(ThreadPoolExecutor(max_workers=self.concurrency,
+                                                          thread_name_prefix='scraper'))
+            convert_pool = None
+            if fetch_only:
+                convert_pool = stack.enter_context(ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')))
+            try:
+                while True:
+                    # Keep the fetchers busy without overshooting max_pages or the conversion backlog
+                    while (not self._cancelled.is_set() and
+                           len(fetching) < self.concurrency and
+                           len(converting) < 2 * max(self.workers, 1) and
+                           self.scraped_count + len(fetching) + len(converting) < self.max_pages):
+                        # For next_url(), which may settle pages itself (see _iter_sitemap_scrape)
+                        self._in_flight = len(fetching) + len(converting)
+                        url = next_url()
+                        if url is None:
+                            break
+                        started[url] = time.perf_counter()
+                        fetching[pool.submit(self._scrape_worker, url, collect_links, fetch_only)] = url
+                    
+                    if not fetching and not converting:
+                        break
+                    
+                    done, _ = wait(list(fetching) + list(converting), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        if future in fetching:
+                            url = fetching.pop(future)
+                            result = future.result()
+                            if isinstance(result, FetchedPage):
+                                if on_links is not None and result.links:
+                                    on_links(url, result.links)
+                                converting[convert_pool.submit(render_page, result.content, url,
+                                                               self.render_options())] = result
+                            else:
+                                self._observe_page(started.pop(url, None))
+                                yield url, result
+                        else:
+                            page = converting.pop(future)
+                            try:
+                                result = self._save_page(page, future.result())
+                            except Exception as e:
+                                self.dedup.release_body(page.url, page.digest)
+                                result = self._scrape_failed(page.url, e, page.links)
+                            self._observe_page(started.pop(page.url, None))
+                            yield page.url, result
+            finally:
+                for future in list(fetching) + list(converting):
+                    future.cancel()
+    
+    def _observe_page(self, started: Optional[float]):
+        if started is not None:
+            self.metrics.observe('page', time.perf_counter() - started)
+    
+    def iter_scrape(self, urls: Iterable[str]) -> Iterator[Tuple[str, bool]]:
+        """Scrape URLs on a bounded worker pool, yielding (url, success) as pages finish.
+        
+        With concurrency=1 this is the plain sequential loop.
+        """
+        url_iter = iter(urls)
+        for url, (ok, _) in self._run_workers(lambda: next(url_iter, None)):
+            yield url, ok
+    
+    def iter_crawl(self, resume_from: Optional[Dict[str, Tuple[str, Optional[int]]]] = None
+                   ) -> Iterator[Tuple[str, bool]]:
+        """Crawl from base_url, converting each page from the same fetch that discovers its links.
+        
+        Conversion starts with the first page instead of waiting for
+        discovery to finish. `discovered_count` tracks how many URLs have
+        been queued so far. With resume_from (checkpointed URL states) the
+        frontier is rebuilt from the unfinished URLs and finished ones are
+        never queued again.
+        """
+        if resume_from:
+            frontier = CrawlFrontier(max_depth=self.max_depth, ignore_query=self.ignore_query)
+            for url, (state, depth) in resume_from.items():
+                if state != DONE:
+                    frontier.add(url, depth or 0)
+            frontier.seen.update(resume_from)
+        else:
+            frontier = self.new_frontier()
+            for url in frontier.seen:
+                self.checkpoint.queue(url, 0)
+        depths: Dict[str, int] = {}
+        self.discovered_count = len(frontier.seen)
+        
+        def next_url() -> Optional[str]:
+            item = frontier.pop()
+            if item is None:
+                return None
+            depths[item[0]] = item[1]
+            return item[0]
+        
+        def add_links(url: str, links: List[str]):
+            depth = depths[url]
+            for link in links:
+                if frontier.add(link, depth + 1):
+                    self.checkpoint.queue(link, depth + 1)
+            self.discovered_count = len(frontier.seen)
+        
+        for url, (ok, links) in self._run_workers(next_url, collect_links=True, on_links=add_links):
+            # Links already added when the page was fetched are no-ops here
+            add_links(url, links)
+            depths.pop(url)
+            yield url, ok
+    
+    def iter_pages(self, urls: Optional[List[str]] = None) -> Iterator[Tuple[str, bool]]:
+        """Discover and scrape pages, yielding (url, success) as each page finishes.
+        
+        Explicit URLs are scraped as given. Otherwise sitemap entries are
+        scraped while the sitemaps are still streaming in, and sites without
+        a sitemap are crawled in a single pass. `discovered_count` holds the
+        number of URLs known so far.
+        
+        Progress is checkpointed as pages finish. With `resume` set, an
+        unfinished scrape in the same output directory is continued: pages
+        it completed are neither fetched nor yielded again (they are listed
+        in `resumed`).
+        """
+        states = self._start_checkpoint()
+        if self._robots_txt is None:
+            self.load_robots()
+        try:
+            for url, ok in self._iter_pages(urls, states):
+                self.checkpoint.mark(url, ok)
+                if self.checkpoint.due():
+                    self.save_checkpoint()
+                yield url, ok
+        finally:
+            self.save_checkpoint()
+    
+    def _iter_pages(self, urls: Optional[List[str]],
+                    states: Dict[str, Tuple[str, Optional[int]]]) -> Iterator[Tuple[str, bool]]:
+        done = {url for url, (state, _) in states.items() if state == DONE}
+        if urls:
+            self.discovered_count = len(urls)
+            yield from self.iter_scrape(url for url in urls if url not in done)
+            return
+        
+        # Try sitemap first; scraping starts with the first entry that arrives
+        entries = self.iter_sitemap_entries()
+        first = next(entries, None)
+        if first is not None:
+            self.logger.info("📄 Scraping sitemap URLs as they are discovered...")
+            yield from self._iter_sitemap_scrape(chain([first], entries), done)
+        else:
+            # Single pass: every crawled page is converted from the fetch that discovered its links
+            self.logger.info("No sitemap found, crawling and scraping in a single pass...")
+            yield from self.iter_crawl(states)
+    
+    def _start_checkpoint(self) -> Dict[str, Tuple[str, Optional[int]]]:
+        """Start checkpointing; when resuming, restore the interrupted run and return its URL states"""
+        self.resumed = []
+        if not self.checkpoint.start(self.base_url, self.resume):
+            if self.resume:
+                self.logger.info("Nothing to resume, starting a new scrape")
+            return {}
+        
+        states = self.checkpoint.states()
+        run = self.manifest.resume_run()
+        self.dedup.duplicates.update(run.get('duplicates', {}))
+        kept = 0
+        for url, status in self.manifest.statuses.items():
+            entry = self.manifest.entries.get(url)
+            if entry and status in ('new', 'changed', 'unchanged'):
+                self.dedup.register(url, entry)
+                kept += 1
+        with self._lock:
+            self.scraped_count = kept
+        self.resumed = [(url, True) for url, (state, _) in states.items() if state == DONE]
+        self.logger.info(f"↩️  Resuming: {len(self.resumed)} pages already done, "
+                         f"{len(states) - len(self.resumed)} still queued or to retry")
+        return states
+    
+    def save_checkpoint(self):
+        """Persist progress so an interrupted scrape can be resumed.
+        
+        Pages and the manifest go first: every page marked done in the
+        checkpoint is then guaranteed to have its page and manifest entry on disk. Rewriting it
+        grows with the site, so checkpoints are spaced out to keep their
+        share of the run at about 5%.
+        """
+        start = time.perf_counter()
+        self.store.flush()
+        if self.search_index is not None:
+            self.search_index.flush()
+        self.manifest.save(run={'duplicates': dict(self.dedup.duplicates)})
+        self.checkpoint.flush()
+        elapsed = time.perf_counter() - start
+        self.checkpoint.min_interval = 20 * elapsed
+        self.metrics.observe('checkpoint', elapsed)
+    
+    def _iter_sitemap_scrape(self, entries: Iterator[SitemapEntry],
+                             done: Set[str] = frozenset()) -> Iterator[Tuple[str, bool]]:
+        """Scrape sitemap entries by priority and recency, skipping pages not modified since last saved.
+        
+        A page whose <lastmod> predates the moment its saved copy was fetched
+        is kept as-is without sending any request. URLs in done were finished
+        by an interrupted run being resumed and are skipped entirely.
+        """
+        scheduler = SitemapScheduler(entries)
+        skipped = deque()
+        
+        def urls() -> Iterator[str]:
+            for entry in scheduler:
+                # Pages skipped here count towards max_pages like scraped ones
+                if self.scraped_count + self._in_flight >= self.max_pages:
+                    return
+                if entry.loc in done:
+                    continue
+                if self.manifest.is_fresh(entry.loc, parse_lastmod(entry.lastmod)):
+                    self._keep_unchanged(entry.loc, None, None, verified=False)
+                    skipped.append(entry.loc)
+                    continue
+                yield entry.loc
+        
+        try:
+            for result in self.iter_scrape(urls()):
+                while skipped:
+                    yield skipped.popleft(), True
+                yield result
+            while skipped:
+                yield skipped.popleft(), True
+        finally:
+            scheduler.close()
     
     def run(self, urls: Optional[List[str]] = None):
         """Run the scraper"""
         self.logger.info(f"🚀 Starting scraper for {self.base_url}")
         self.logger.info(f"📁 Output directory: {self.output_dir.absolute()}")
         
-        # Get URLs to scrape
-        if urls:
-            urls_to_scrape = urls
-        else:
-            # Try sitemap first
-            urls_to_scrape = self.get_sitemap_urls()
-            
-            if not urls_to_scrape:
-                self.logger.info("No sitemap found, starting crawl discovery...")
-                urls_to_scrape = self.discover_urls_by_crawling()
+        if self.concurrency > 1:
+            self.logger.info(f"⚡ Using {self.concurrency} workers "
+                             f"({self.per_host_limit} per host)")
+        
+        success_count = 0
+        urls_to_scrape = []
+        try:
+            for i, (url, ok) in enumerate(self.iter_pages(urls), 1):
+                urls_to_scrape.append(url)
+                if ok:
+                    success_count += 1
+                self.logger.info(f"[{i}/{self.discovered_count}] {'done' if ok else 'failed'}: {url}")
+        except KeyboardInterrupt:
+            self.logger.warning(f"Interrupted; progress is checkpointed, continue with --resume -o {self.output_dir}")
+            raise
+        
+        if self.cancelled:
+            self.logger.warning(f"Cancelled; progress is checkpointed, continue with --resume -o {self.output_dir}")
+            return
+        
+        # Pages finished before an interrupted run count towards this one
+        urls_to_scrape = [url for url, _ in self.resumed] + urls_to_scrape
+        success_count += len(self.resumed)
         
         if not urls_to_scrape:
             self.logger.error("No URLs found to scrape!")
             return
         
-        self.logger.info(f"📄 Found {len(urls_to_scrape)} URLs to scrape")
-        
-        # Scrape pages
-        success_count = 0
-        for i, url in enumerate(urls_to_scrape, 1):
-            if self.scraped_count >= self.max_pages:
-                self.logger.warning(f"Reached maximum page limit ({self.max_pages})")
-                break
-                
-            self.logger.info(f"\n[{i}/{len(urls_to_scrape)}]")
-            
-            if self.scrape_page(url):
-                success_count += 1
-            
-            # Rate limiting
-            time.sleep(self.rate_limit)
+        if self.scraped_count >= self.max_pages:
+            self.logger.warning(f"Reached maximum page limit ({self.max_pages})")
         
         self.logger.info(f"\n🎉 Scraping complete! {success_count}/{len(urls_to_scrape)} pages scraped successfully")
         self.logger.info(f"📁 Files saved to: {self.output_dir.absolute()}")
+        if self.http_cache is not None:
+            cache = self.cache_stats.to_dict()
+            self.logger.info(f"🗄️  HTTP cache: {cache['hit_rate']:.0%} hit rate, "
+                             f"{cache['bytes_saved'] / 1024 / 1024:.1f} MB not downloaded")
         
-        # Save scraping summary
-        self.save_summary(urls_to_scrape, success_count)
+        # Save scraping summary; an explicit URL list never covers the whole site
+        self.save_summary(urls_to_scrape, success_count,
+                          complete=not urls and self.scraped_count < self.max_pages)
         
         # Create combined markdown file
         if success_count > 0:
             self.create_combined_markdown()
     
-    def save_summary(self, urls: List[str], success_count: int):
-        """Save a summary of the scraping session"""
+    def save_summary(self, urls: List[str], success_count: int,
+                     complete: Optional[bool] = None):
+        """Save a summary of the scraping session.
+        
+        `complete` says whether the run covered the whole site, which is the
+        only case where pages missing from this run count as deleted. By
+        default a run is complete unless it stopped at max_pages.
+        """
+        if complete is None:
+            complete = self.scraped_count < self.max_pages
+        page_counts = self.manifest.finalize(complete)
+        self.store.flush()
+        if self.search_index is not None:
+            self.search_index.sync({entry['filename']: (url, entry.get('title') or 'Untitled')
+                                    for url, entry in self.manifest.entries.items()
+                                    if entry.get('filename')},
+                                   self.store.read)
+            self.search_index.optimize()
+        self.manifest.save()
+        self.checkpoint.finish()
+        
         summary = {
             'base_url': self.base_url,
             'total_urls': len(urls),
@@ -338,62 +985,62 @@ class UniversalDocsScraper:
             'failed_scrapes': len(urls) - success_count,
             'scraped_at': datetime.now().isoformat(),
             'rate_limit': self.rate_limit,
-            'max_pages': self.max_pages
+            'max_pages': self.max_pages,
+            'output_format': self.output_format,
+            'pages': page_counts,
+            'duplicates': dict(self.dedup.duplicates),
+            'site_profile': self.site_profile.to_dict(),
+            'rate_limits': self.rate_limiter.to_dict(),
+            'metrics': self.metrics.to_dict()
+        }
+        if self.http_cache is not None:
+            summary['http_cache'] = self.cache_stats.to_dict()
+        if self.chunk_writer is not None:
+            summary['chunks'] = self.chunk_writer.to_dict()
+        counters = self.metrics.to_dict()['counters']
+        summary['content_filter'] = {
+            'max_page_size': self.max_page_size,
+            'rejected_non_html': counters.get('rejected_non_html', 0),
+            'rejected_too_large': counters.get('rejected_too_large', 0),
+            'bytes_avoided': counters.get('bytes_avoided', 0)
         }
         
         summary_file = self.output_dir / 'scraping_summary.json'
         with open(summary_file, 'w') as f:
             json.dump(summary, f, indent=2)
     
+    def close(self):
+        """Release the HTTP connections, the page store, the checkpoint database and the log file"""
+        self.session.close()
+        self.combined.close()
+        self.store.close()
+        if self.search_index is not None:
+            self.search_index.close()
+        if self.chunk_writer is not None:
+            self.chunk_writer.close()
+        self.checkpoint.close()
+        if self._log_file_handler is not None:
+            self.logger.removeHandler(self._log_file_handler)
+            self._log_file_handler.close()
+            self._log_file_handler = None
+    
     def create_combined_markdown(self):
-        """Create a single markdown file with all scraped content"""
-        self.logger.info("Creating combined markdown file...")
+        """Create a single markdown file with all scraped content.
         
-        combined_file = self.output_dir / 'COMBINED_DOCUMENTATION.md'
+        Covers every page in the manifest, in filename order. Pages saved in
+        this run come from the combined stream and the rest from their files,
+        with titles taken from the manifest, so no page is parsed again.
+        """
+        self.logger.info("Creating combined markdown file...")
         
-        with open(combined_file, 'w', encoding='utf-8') as combined:
-            # Write header
-            combined.write(f"""# Combined Documentation - {self.base_url}
-
-Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-Total files: {len(list(self.output_dir.glob('*.md')))}
-
----
-
-""")
-            
-            # Sort markdown files for consistent ordering
-            md_files = sorted([f for f in self.output_dir.glob('*.md') 
-                              if f.name not in ['COMBINED_DOCUMENTATION.md', 'README.md']])
-            
-            for i, md_file in enumerate(md_files, 1):
-                try:
-                    with open(md_file, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    
-                    # Extract title from content or use filename
-                    title = md_file.stem.replace('_', ' ').title()
-                    if content.startswith('---'):
-                        # Try to extract title from frontmatter
-                        lines = content.split('\n')
-                        for line in lines[1:]:
-                            if line.startswith('---'):
-                                break
-                            if line.startswith('title:'):
-                                title = line.replace('title:', '').strip().strip('"\'')
-                    
-                    combined.write(f"\n\n{'='*80}\n")
-                    combined.write(f"## [{i}] {title}\n")
-                    combined.write(f"Source: {md_file.name}\n")
-                    combined.write(f"{'='*80}\n\n")
-                    combined.write(content)
-                    combined.write("\n\n")
-                    
-                except Exception as e:
-                    self.logger.error(f"Error adding {md_file} to combined file: {e}")
+        try:
+            with self.metrics.time('combine'):
+                count = self.combined.finalize(self.base_url, self.manifest.files().items())
+        except Exception as e:
+            self.logger.error(f"Error creating combined file: {e}")
+            return
         
-        self.logger.info(f"✅ Combined markdown saved as COMBINED_DOCUMENTATION.md")
-
+        self.logger.info(f"✅ Combined markdown saved as {CombinedDocument.FILENAME} ({count} pages)")
 
 def main():
     parser = argparse.ArgumentParser(description='Universal Documentation Scraper')
@@ -401,9 +1048,44 @@ def main():
     parser.add_argument('-o', '--output', default='scraped_docs', 
                         help='Output directory (default: scraped_docs)')
     parser.add_argument('-r', '--rate-limit', type=float, default=1.0,
-                        help='Seconds between requests (default: 1.0)')
+                        help='Minimum seconds between requests per fetch slot; the adaptive '
+                             'limiter never goes faster than this (default: 1.0, 0 = no ceiling)')
     parser.add_argument('-m', '--max-pages', type=int, default=1000,
                         help='Maximum number of pages to scrape (default: 1000)')
+    parser.add_argument('-c', '--concurrency', type=int, default=1,
+                        help='Number of pages to fetch in parallel (default: 1)')
+    parser.add_argument('--per-host', type=int, default=None,
+                        help='Maximum parallel requests per host (default: same as --concurrency)')
+    parser.add_argument('--max-depth', type=int, default=None,
+                        help='Maximum link depth to follow when crawling (default: unlimited)')
+    parser.add_argument('--ignore-query', action='store_true',
+                        help='Treat URLs that differ only in their query string as the same page')
+    parser.add_argument('-w', '--workers', type=int, default=0,
+                        help='Processes for HTML-to-markdown conversion (default: 0, convert on the fetch threads)')
+    parser.add_argument('--engine', choices=MARKDOWN_ENGINES, default='tree',
+                        help='HTML-to-markdown engine: convert the parsed tree directly, '
+                             'or re-serialize it for markdownify (default: tree)')
+    parser.add_argument('--parser', choices=HTML_PARSERS, default='html.parser',
+                        help='HTML parser backend (default: html.parser)')
+    parser.add_argument('--output-format', choices=OUTPUT_FORMATS, default='files',
+                        help='Save one markdown file per page, or all pages in one pages.jsonl or '
+                             'pages.sqlite bundle (export with scraper/store.py) (default: files)')
+    parser.add_argument('--search-index', action='store_true',
+                        help='Build a full-text index of page sections while scraping (search with scraper/search.py)')
+    parser.add_argument('--chunks', metavar='PATH', default=None,
+                        help="Stream heading-aware chunks of every page as JSON lines to PATH ('-' for stdout)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f'Maximum characters per chunk (default: {DEFAULT_CHUNK_SIZE})')
+    parser.add_argument('--max-page-size', type=float, default=DEFAULT_MAX_PAGE_SIZE / (1024 * 1024),
+                        help='Skip pages larger than this many MB without downloading them (default: 10, 0 = no limit)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue an interrupted scrape in the output directory without re-fetching finished pages')
+    parser.add_argument('--http-cache', metavar='DIR', default=None,
+                        help='Directory of a response cache shared between runs (default: no cache)')
+    parser.add_argument('--http-cache-size', type=int, default=512,
+                        help='Maximum size of the response cache in MB (default: 512)')
+    parser.add_argument('--profile', metavar='PATH', default=None,
+                        help='Write a cProfile of the scrape (main and fetch threads) to PATH')
     parser.add_argument('--urls', nargs='+', help='Specific URLs to scrape')
     
     args = parser.parse_args()
@@ -412,10 +1094,34 @@ def main():
         base_url=args.url,
         output_dir=args.output,
         rate_limit=args.rate_limit,
-        max_pages=args.max_pages
+        max_pages=args.max_pages,
+        concurrency=args.concurrency,
+        per_host_limit=args.per_host,
+        max_depth=args.max_depth,
+        ignore_query=args.ignore_query,
+        workers=args.workers,
+        markdown_engine=args.engine,
+        html_parser=args.parser,
+        resume=args.resume,
+        output_format=args.output_format,
+        search_index=args.search_index,
+        chunks=args.chunks,
+        chunk_size=args.chunk_size,
+        max_page_size=int(args.max_page_size * 1024 * 1024),
+        http_cache=HttpCache(args.http_cache, args.http_cache_size * 1024 * 1024) if args.http_cache else None,
+        profiler=Profiler() if args.profile else None
     )
     
-    scraper.run(urls=args.urls)
+    if args.profile:
+        scraper.profiler.start()
+    try:
+        scraper.run(urls=args.urls)
+    finally:
+        if args.profile:
+            scraper.profiler.stop()
+            report = scraper.profiler.dump(args.profile)
+            scraper.logger.info(f"📈 Profile written to {args.profile}; top functions by cumulative time:\n{report}")
+        scraper.close()
 
 
 if __name__ == "__main__":
@@ -6,14 +6,25 @@ Deploy directly to Streamlit Cloud for free!
 import streamlit as st
 import sys
 import os
+import secrets
+import threading
+from collections import deque
+from itertools import islice
 from pathlib import Path
-import zipfile
-import io
 from datetime import datetime
 
 # Add scraper to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from scraper.universal_scraper import UniversalDocsScraper
+from scraper.archive import build_archive
+from scraper.joblog import FINISHED_STATUSES, MAX_EVENTS, job_logger, release_logger
+
+# Recent pages shown while a scrape runs; older ones only count towards the totals
+RECENT_PAGES = 30
+# Finished jobs kept for reattaching and downloading; the oldest are forgotten first
+MAX_JOBS = 20
+# Seconds between progress refreshes
+POLL_INTERVAL = 1.0
 
 st.set_page_config(
     page_title="Universal Docs Scraper",
@@ -21,90 +32,213 @@ st.set_page_config(
     layout="wide"
 )
 
+
+class ScrapeJob:
+    """A scrape running on a background thread, independent of script reruns.
+    
+    The thread updates counters and a ring buffer of recent pages; reruns
+    only read a snapshot of the latest few, so what the page renders stays
+    the same size however many pages are scraped.
+    """
+    
+    def __init__(self, url, rate_limit, max_pages, concurrency):
+        self.id = secrets.token_urlsafe(8)
+        self.url = url
+        self.rate_limit = rate_limit
+        self.max_pages = max_pages
+        self.concurrency = concurrency
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        domain = url.split('/')[2].replace('www.', '')
+        self.output_dir = f"scraped_{domain}_{timestamp}"
+        self.status = "running"
+        self.phase = "Discovering pages..."
+        self.scraped = 0
+        self.failed = 0
+        self.events = deque(maxlen=MAX_EVENTS)
+        self.error = None
+        self.archive = None
+        self.started_at = datetime.now()
+        self.finished_at = None
+        self.scraper = None
+        self._cancel_requested = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=f'scrape-{self.id}', daemon=True)
+    
+    def start(self):
+        self._thread.start()
+    
+    def cancel(self):
+        with self._lock:
+            self._cancel_requested = True
+            scraper = self.scraper
+        if scraper is not None:
+            scraper.cancel()
+    
+    def _run(self):
+        # A logger per job, so each scrape writes only its own scraper.log even when
+        # jobs overlap; it is released again when the job ends
+        logger = job_logger(f'streamlit.scrape.{self.id}')
+        scraper = None
+        urls = []
+        try:
+            scraper = UniversalDocsScraper(
+                base_url=self.url,
+                output_dir=self.output_dir,
+                rate_limit=self.rate_limit,
+                max_pages=self.max_pages,
+                concurrency=self.concurrency,
+                logger=logger
+            )
+            with self._lock:
+                self.scraper = scraper
+                if self._cancel_requested:
+                    scraper.cancel()
+            
+            # Pages are scraped while sitemaps stream in or the crawl discovers them
+            for page_url, ok in scraper.iter_pages():
+                urls.append(page_url)
+                with self._lock:
+                    self.phase = "Scraping pages..."
+                    if ok:
+                        self.scraped += 1
+                    else:
+                        self.failed += 1
+                    self.events.append((ok, page_url))
+            
+            if scraper.cancelled:
+                self._finish("cancelled")
+                return
+            scraper.save_summary(urls, self.scraped)
+            if scraper.scraped_count == 0:
+                self._finish("error", "No pages could be scraped")
+                return
+            
+            self.phase = "Creating combined markdown..."
+            scraper.create_combined_markdown()
+            # The archive is written to disk once, next to the output directory
+            self.phase = "Creating download package..."
+            scraper.close()
+            self.archive = build_archive(self.output_dir)
+            self._finish("completed")
+        except Exception as e:
+            self._finish("error", str(e))
+        finally:
+            if scraper is not None:
+                scraper.close()
+            release_logger(logger)
+    
+    def _finish(self, status, error=None):
+        with self._lock:
+            self.status = status
+            self.error = error
+            self.finished_at = datetime.now()
+    
+    def snapshot(self) -> dict:
+        """Consistent copy of the job's progress for rendering"""
+        with self._lock:
+            discovered = self.scraper.discovered_count if self.scraper else 0
+            done = self.scraped + self.failed
+            return {
+                'status': self.status,
+                'phase': self.phase,
+                'scraped': self.scraped,
+                'failed': self.failed,
+                'total': max(min(discovered, self.max_pages), done),
+                'events': list(islice(self.events, max(0, len(self.events) - RECENT_PAGES), None)),
+                'error': self.error,
+                'archive': self.archive
+            }
+
+
+@st.cache_resource
+def scrape_jobs():
+    """Jobs shared by every session of this server, so they survive reruns and page reloads"""
+    return {}
+
+
+def start_job(url, rate_limit, max_pages, concurrency) -> ScrapeJob:
+    jobs = scrape_jobs()
+    job = ScrapeJob(url, rate_limit, max_pages, concurrency)
+    finished = sorted((j for j in jobs.values() if j.status in FINISHED_STATUSES),
+                      key=lambda j: j.finished_at)
+    for old in finished[:max(0, len(jobs) + 1 - MAX_JOBS)]:
+        jobs.pop(old.id, None)
+    jobs[job.id] = job
+    job.start()
+    return job
+
+
+def render_progress(job: ScrapeJob, snapshot: dict):
+    total = snapshot['total']
+    done = snapshot['scraped'] + snapshot['failed']
+    st.progress(done / total if total else 0.0)
+    st.text(f"{snapshot['phase']} {done}/{total}" if snapshot['status'] == "running" else
+            f"{done}/{total} pages processed")
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Scraped", snapshot['scraped'])
+    col2.metric("Failed", snapshot['failed'])
+    col3.metric("Discovered", total)
+    if snapshot['events']:
+        st.caption(f"Last {len(snapshot['events'])} pages")
+        st.code('\n'.join(f"{'✅' if ok else '❌'} {page_url}" for ok, page_url in reversed(snapshot['events'])),
+                language=None)
+
+
+@st.fragment(run_every=POLL_INTERVAL)
+def watch_job(job: ScrapeJob):
+    """Refresh the progress of a running job; only this fragment reruns while it polls"""
+    snapshot = job.snapshot()
+    if snapshot['status'] in FINISHED_STATUSES:
+        # Rerun the whole page once to show the final result instead of polling
+        st.rerun()
+    render_progress(job, snapshot)
+    if st.button("Cancel"):
+        job.cancel()
+
+
 st.title("📚 Universal Documentation Scraper")
 st.markdown("Convert any documentation website to clean Markdown files")
 
 # Input form
 with st.form("scraper_form"):
     url = st.text_input("Documentation URL", placeholder="https://docs.example.com")
-    col1, col2 = st.columns(2)
+    col1, col2, col3 = st.columns(3)
     with col1:
         rate_limit = st.number_input("Rate Limit (seconds)", min_value=0.1, value=1.0, step=0.1)
     with col2:
         max_pages = st.number_input("Max Pages", min_value=1, value=100)
+    with col3:
+        concurrency = st.number_input("Concurrent Requests", min_value=1, max_value=16, value=1)
     
     submitted = st.form_submit_button("Start Scraping", type="primary")
 
 if submitted and url:
-    # Create output directory
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    domain = url.split('/')[2].replace('www.', '')
-    output_dir = f"scraped_{domain}_{timestamp}"
-    
-    # Progress tracking
-    progress_bar = st.progress(0)
-    status_text = st.empty()
-    log_container = st.container()
-    
-    # Initialize scraper
-    scraper = UniversalDocsScraper(
-        base_url=url,
-        output_dir=output_dir,
-        rate_limit=rate_limit,
-        max_pages=max_pages
-    )
-    
-    # Run scraper
-    with st.spinner("Discovering URLs..."):
-        urls = scraper.get_sitemap_urls()
-        if not urls:
-            urls = scraper.discover_urls_by_crawling()
-    
-    if urls:
-        st.success(f"Found {len(urls)} URLs to scrape")
-        
-        # Scrape pages
-        for i, page_url in enumerate(urls):
-            progress = (i + 1) / len(urls)
-            progress_bar.progress(progress)
-            status_text.text(f"Scraping {i+1}/{len(urls)}: {page_url}")
-            
-            with log_container:
-                if scraper.scrape_page(page_url):
-                    st.success(f"✅ Scraped: {page_url}")
-                else:
-                    st.error(f"❌ Failed: {page_url}")
-            
-            if scraper.scraped_count >= max_pages:
-                break
-        
-        # Create combined markdown
-        if scraper.scraped_count > 0:
-            with st.spinner("Creating combined markdown..."):
-                scraper.create_combined_markdown()
-        
-        # Create download
-        with st.spinner("Creating download package..."):
-            zip_buffer = io.BytesIO()
-            with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-                for root, dirs, files in os.walk(output_dir):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        arcname = os.path.relpath(file_path, output_dir)
-                        zf.write(file_path, arcname)
-            
-            zip_buffer.seek(0)
-            
+    job = start_job(url, rate_limit, int(max_pages), int(concurrency))
+    # The job ID in the URL lets a reloaded page find the job again
+    st.query_params['job'] = job.id
+
+job = scrape_jobs().get(st.query_params.get('job', ''))
+if job is not None:
+    st.subheader(f"Scraping {job.url}")
+    snapshot = job.snapshot()
+    if snapshot['status'] == "running":
+        watch_job(job)
+    else:
+        render_progress(job, snapshot)
+        if snapshot['status'] == "completed":
+            # Read from the on-disk archive only when the button is clicked, never on a rerun
             st.download_button(
                 label="📥 Download Scraped Documentation",
-                data=zip_buffer,
-                file_name=f"{output_dir}.zip",
-                mime="application/zip"
+                data=Path(snapshot['archive']).read_bytes,
+                file_name=f"{job.output_dir}.zip",
+                mime="application/zip",
+                on_click="ignore"
             )
-            
-            st.success(f"✅ Scraping complete! {scraper.scraped_count} pages scraped.")
-    else:
-        st.error("No URLs found to scrape")
+            st.success(f"✅ Scraping complete! {snapshot['scraped']} pages scraped.")
+        elif snapshot['status'] == "cancelled":
+            st.warning("Scraping cancelled")
+        else:
+            st.error(snapshot['error'] or "Scraping failed")
 
 # Features section
 with st.expander("✨ Features"):